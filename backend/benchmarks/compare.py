@@ -0,0 +1,40 @@
+# backend/benchmarks/compare.py
+import argparse
+import json
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return "n/d"
+    return f"{(new / old - 1) * 100:+.1f}%"
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    """Imprime, por endpoint, as métricas de duas execuções do benchmark e a variação."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(candidate_path, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    print(f"{'endpoint':<18}{'métrica':<16}{'base':>12}{'novo':>12}{'variação':>12}")
+    for endpoint, new_stats in candidate["endpoints"].items():
+        old_stats = baseline["endpoints"].get(endpoint)
+        if not old_stats:
+            continue
+        for metric in METRICS:
+            old, new = old_stats[metric], new_stats[metric]
+            print(f"{endpoint:<18}{metric:<16}{old:>12}{new:>12}{_delta(old, new):>12}")
+
+    if baseline.get("indexing") and candidate.get("indexing"):
+        old, new = baseline["indexing"]["docs_per_sec"], candidate["indexing"]["docs_per_sec"]
+        print(f"{'indexing':<18}{'docs_per_sec':<16}{old:>12}{new:>12}{_delta(old, new):>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmarks.run_benchmark.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    compare(args.baseline, args.candidate)
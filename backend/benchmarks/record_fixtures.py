@@ -0,0 +1,29 @@
+# backend/benchmarks/record_fixtures.py
+import argparse
+
+from tools.datasource import IpeaDataSource
+
+
+def record_fixtures(codes, out_dir: str) -> None:
+    """
+    Grava as respostas reais do IPEA com `tools.datasource` em modo record.
+
+    O catálogo gravado é reduzido às séries escolhidas, para que os indexadores
+    em modo replay percorram apenas séries que têm fixture.
+    """
+    source = IpeaDataSource("record", out_dir)
+    meta_df = source.metadata()
+    source.write_fixture("metadata", meta_df[meta_df["CODE"].isin(codes)].reset_index(drop=True))
+
+    for code in codes:
+        print(f"Gravando série {code}...")
+        source.timeseries(code)
+    print(f"✅ {len(codes)} séries gravadas em {out_dir}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grava fixtures do IPEA para o benchmark offline.")
+    parser.add_argument("--codes", nargs="+", required=True, help="Códigos das séries (SERCODIGO)")
+    parser.add_argument("--out", default="benchmarks/fixtures", help="Diretório de saída")
+    args = parser.parse_args()
+    record_fixtures(args.codes, args.out)
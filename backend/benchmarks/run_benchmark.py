@@ -0,0 +1,226 @@
+# backend/benchmarks/run_benchmark.py
+"""
+Benchmark ponta a ponta, totalmente offline.
+
+Sobe stubs locais do Tika e do LLM, usa `tools.datasource` em modo replay,
+indexa as séries em um redis-stack local, sobe a API em processo e dispara
+requisições concorrentes contra cada endpoint. O resultado (latências p50/p95/p99,
+vazão por endpoint e docs/s da indexação) é gravado em JSON para comparação
+entre execuções com `benchmarks.compare`.
+
+Uso (a partir de backend/, com um redis-stack descartável em localhost:6379):
+
+    python -m benchmarks.run_benchmark --synthetic 8 --concurrency 8 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+import requests
+
+from benchmarks.synthetic_fixtures import make_synthetic_fixtures
+from benchmarks.stubs import StubLLMHandler, StubTikaHandler, start_stub_server
+
+
+def _configure_environment(args) -> None:
+    """Precisa rodar antes de importar qualquer módulo do backend."""
+    fixtures = args.fixtures
+    if args.synthetic:
+        fixtures = tempfile.mkdtemp(prefix="ipea-fixtures-")
+        make_synthetic_fixtures(fixtures, n_series=args.synthetic)
+    # O backend inteiro passa a ler as respostas do IPEA do disco
+    os.environ["IPEA_DATASOURCE_MODE"] = "replay"
+    os.environ["IPEA_FIXTURES_DIR"] = fixtures
+
+    tika = start_stub_server(StubTikaHandler)
+    llm = start_stub_server(StubLLMHandler, delay=args.llm_delay)
+    os.environ["TIKA_SERVER_ENDPOINT"] = f"http://127.0.0.1:{tika.server_address[1]}"
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{llm.server_address[1]}"
+    os.environ.pop("OPENAI_API_KEY", None)
+    os.environ["REDIS_URL"] = args.redis_url
+
+
+def _run_indexing(redis_url: str, workers: int = 1, threads_per_worker: int = 0) -> Dict[str, float]:
+    import redis
+    from rag.index_keys import INDEX_ALIAS
+    from tools.index_data import index_all_series
+
+    r = redis.Redis.from_url(redis_url)
+
+    def num_docs() -> int:
+        try:
+            return int(r.ft(INDEX_ALIAS).info()["num_docs"])
+        except redis.ResponseError:
+            return 0
+
+    before = num_docs()
+    start = time.perf_counter()
+    index_all_series(workers, threads_per_worker)
+    seconds = time.perf_counter() - start
+    docs = num_docs() - before
+    return {
+        "docs": docs,
+        "seconds": round(seconds, 3),
+        "docs_per_sec": round(docs / seconds, 2) if seconds else 0.0,
+        "workers": workers,
+        "threads_per_worker": threads_per_worker,
+    }
+
+
+def _start_api(port: int) -> None:
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+
+def _wait_ready(base_url: str, timeout: float = 300) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/ready", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"A API não ficou pronta em {timeout}s.")
+
+
+def _drive(call: Callable[[int], requests.Response], total: int, concurrency: int) -> Dict[str, float]:
+    """Executa `total` chamadas com `concurrency` threads e resume as latências."""
+
+    def timed(i: int):
+        start = time.perf_counter()
+        try:
+            ok = call(i).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = np.array([r[0] for r in results]) * 1000
+    return {
+        "requests": total,
+        "errors": sum(1 for r in results if not r[1]),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+        "throughput_rps": round(total / wall, 2),
+    }
+
+
+def _endpoint_calls(base_url: str, codes: List[str], names: List[str], attachment: bytes) -> Dict[str, Callable]:
+    def question(i: int) -> str:
+        return f"Como evoluiu {names[i % len(names)].lower()} entre 1990 e 2000?"
+
+    def query_payload(i: int) -> dict:
+        return {
+            "question": question(i),
+            "sercodigo": codes[i % len(codes)],
+            "use_model": "ollama",
+            "model_name": "stub",
+        }
+
+    return {
+        "find_series": lambda i: requests.post(
+            f"{base_url}/find_series", json={"question": question(i), "top_k": 5}, timeout=120
+        ),
+        "query": lambda i: requests.post(f"{base_url}/query", data=query_payload(i), timeout=300),
+        "query_attachment": lambda i: requests.post(
+            f"{base_url}/query",
+            data=query_payload(i),
+            files={"attachment": ("documento.txt", attachment, "text/plain")},
+            timeout=300,
+        ),
+        "series_data": lambda i: requests.get(
+            f"{base_url}/series/{codes[i % len(codes)]}/data", params={"points": 1000}, timeout=120
+        ),
+        "indexed_series": lambda i: requests.get(f"{base_url}/indexed_series", timeout=120),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline dos endpoints do backend.")
+    parser.add_argument("--fixtures", default="benchmarks/fixtures", help="Fixtures gravadas do IPEA")
+    parser.add_argument("--synthetic", type=int, default=0, help="Gera N séries sintéticas em vez de usar --fixtures")
+    parser.add_argument("--redis-url", default="redis://localhost:6379", help="redis-stack local e descartável")
+    parser.add_argument("--port", type=int, default=18997)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requisições por endpoint")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="Atraso simulado do LLM, em segundos")
+    parser.add_argument("--attachment-pages", type=int, default=200, help="Tamanho do anexo de teste")
+    parser.add_argument("--index-workers", type=int, default=1, help="Processos de embedding na indexação")
+    parser.add_argument("--index-threads", type=int, default=0, help="Threads do torch por processo de indexação")
+    parser.add_argument("--skip-indexing", action="store_true", help="Reaproveita o índice já existente")
+    parser.add_argument("--endpoints", nargs="*", help="Subconjunto de endpoints a medir")
+    parser.add_argument("--output", default="bench_output.json")
+    args = parser.parse_args()
+
+    _configure_environment(args)
+
+    indexing = None if args.skip_indexing else _run_indexing(args.redis_url, args.index_workers, args.index_threads)
+    if indexing:
+        print(f"📦 Indexação: {indexing}")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    _start_api(args.port)
+    _wait_ready(base_url)
+
+    from tools.datasource import ipea
+
+    meta = ipea.metadata()
+    codes, names = meta["CODE"].tolist(), meta["NAME"].tolist()
+    paragraph = " ".join(f"{name}: parágrafo de contexto sobre a série." for name in names)
+    attachment = "\n\n".join(f"Página {p}. {paragraph}" for p in range(args.attachment_pages)).encode("utf-8")
+
+    calls = _endpoint_calls(base_url, codes, names, attachment)
+    selected = args.endpoints or list(calls)
+    endpoints = {}
+    for name in selected:
+        endpoints[name] = _drive(calls[name], args.requests, args.concurrency)
+        print(f"⏱️  {name}: {endpoints[name]}")
+
+    report = {
+        "run": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "llm_delay_s": args.llm_delay,
+            "fixtures": os.environ["IPEA_FIXTURES_DIR"],
+        },
+        "indexing": indexing,
+        "endpoints": endpoints,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultado gravado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
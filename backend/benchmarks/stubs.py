@@ -0,0 +1,62 @@
+# backend/benchmarks/stubs.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubTikaHandler(_QuietHandler):
+    """
+    Substituto do Apache Tika: `PUT /tika` devolve o corpo recebido como texto
+    (os anexos de benchmark já são texto puro).
+    """
+
+    def do_GET(self):
+        self._send(200, b"Apache Tika stub", "text/plain")
+
+    def do_PUT(self):
+        length = int(self.headers.get("Content-Length", 0))
+        content = self.rfile.read(length)
+        self._send(200, content.decode("utf-8", errors="ignore").encode("utf-8"), "text/plain; charset=utf-8")
+
+
+class StubLLMHandler(_QuietHandler):
+    """
+    Substituto do Ollama: `POST /api/generate` espera `delay` segundos e
+    devolve uma resposta fixa; `GET /api/tags` responde ao /ready.
+    """
+
+    delay = 0.0
+
+    def do_GET(self):
+        self._send(200, json.dumps({"models": [{"name": "stub"}]}).encode(), "application/json")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.delay)
+        answer = {"model": payload.get("model", "stub"), "text": "Resposta simulada para benchmark.", "done": True}
+        self._send(200, json.dumps(answer).encode(), "application/json")
+
+
+def start_stub_server(handler: type, port: int = 0, **attrs) -> ThreadingHTTPServer:
+    """
+    Sobe um servidor HTTP em uma thread daemon e o devolve; a porta escolhida
+    fica em `server.server_address[1]`. `attrs` sobrescreve atributos do handler.
+    """
+    handler_cls = type(handler.__name__, (handler,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_cls)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,48 @@
+# backend/benchmarks/synthetic_fixtures.py
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def make_synthetic_fixtures(out_dir: str, n_series: int = 20, seed: int = 42) -> None:
+    """
+    Gera fixtures sintéticas no formato de `tools.datasource` (modo replay),
+    com DataFrames iguais aos do ipeadatapy, para rodar o benchmark sem ter
+    gravado o IPEA antes.
+    """
+    rng = np.random.default_rng(seed)
+    out = Path(out_dir)
+    (out / "series").mkdir(parents=True, exist_ok=True)
+
+    freqs = [("Diária", "D", 10_000), ("Mensal", "MS", 600), ("Trimestral", "QS", 200), ("Anual", "YS", 80)]
+    themes = ["abate de frangos", "produção de soja", "inflação IPCA", "taxa de câmbio", "PIB estadual"]
+    rows = []
+    for i in range(n_series):
+        freq_name, freq, size = freqs[i % len(freqs)]
+        code = f"BENCH_{i:04d}"
+        theme = themes[i % len(themes)]
+        index = pd.date_range("1950-01-01", periods=size, freq=freq)
+        values = 100 + np.cumsum(rng.normal(0.1, 1.0, size))
+        df = pd.DataFrame(
+            {
+                "CODE": code,
+                "RAW DATE": index.strftime("%Y-%m-%dT00:00:00-03:00"),
+                "DAY": index.day,
+                "MONTH": index.month,
+                "YEAR": index.year,
+                "VALUE (-)": values,
+            },
+            index=pd.Index(index, name="DATE"),
+        )
+        df.to_pickle(out / "series" / f"{code}.pkl.gz", compression="gzip")
+        rows.append(
+            {
+                "CODE": code,
+                "NAME": f"{theme.capitalize()} - série {i}",
+                "COMMENT": f"Série sintética de {theme} para benchmark.",
+                "UNIT": "-",
+                "FREQUENCY": freq_name,
+            }
+        )
+    pd.DataFrame(rows).to_pickle(out / "metadata.pkl.gz", compression="gzip")
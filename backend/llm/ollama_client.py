@@ -43,6 +43,25 @@ def openai_generate(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 1
     #return {"text": text, "raw": response}
     return text
 
+def check_llm_providers(timeout: float = 3.0) -> Dict[str, bool]:
+    """
+    Verifica quais provedores de LLM estão acessíveis (usado pelo /ready).
+    """
+    providers = {}
+    if OLLAMA_URL:
+        try:
+            requests.get(f"{OLLAMA_URL}/api/tags", timeout=timeout).raise_for_status()
+            providers["ollama"] = True
+        except requests.RequestException:
+            providers["ollama"] = False
+    if OPENAI_API_KEY:
+        try:
+            OpenAI(api_key=OPENAI_API_KEY, timeout=timeout, max_retries=0).models.list()
+            providers["openai"] = True
+        except Exception:
+            providers["openai"] = False
+    return providers
+
 def generate_answer(prompt: str, preferred: str = "ollama", **kwargs) -> Dict[str, Any]:
     """
     Composite helper: try preferred (ollama) then fallback to OpenAI if available.
@@ -0,0 +1,21 @@
+# backend/llm/tokens.py
+import os
+from functools import lru_cache
+
+import tiktoken
+
+TOKEN_ENCODING = os.environ.get("TOKEN_ENCODING", "cl100k_base")
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Conta os tokens de um texto com o mesmo encoder usado para dividir os documentos.
+    """
+    if not text:
+        return 0
+    return len(_encoding().encode(text, disallowed_special=()))
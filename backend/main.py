@@ -1,17 +1,29 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException, Form, File, UploadFile
+from fastapi import FastAPI, HTTPException, Form, File, UploadFile, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional,Tuple
-import ipeadatapy as ip
+from typing import Dict, List, Optional,Tuple
 import numpy as np
 import pandas as pd
 import requests
-import re
+import asyncio
+import hashlib
+import orjson
 from contextlib import asynccontextmanager
-from tools.ipeadata import search_metadata_by_keyword, get_series_values, get_metadata_by_sercodigo
-from rag.retrieval import index_ipea_series, retrieve_similar, build_context_from_results
-from llm.ollama_client import generate_answer
-from rag.embedding import RedisVectorStore # Sua classe
+from tools.ipeadata import search_metadata_by_keyword, get_series_values, get_metadata_by_sercodigo, prewarm_metadata
+from tools.timeseries_store import SeriesTimeSeriesStore
+from tools.chart_data import series_chart_payload
+from llm.ollama_client import generate_answer, check_llm_providers
+from rag.embedding import create_vector_store
+from rag.attachment import build_attachment_context
+from rag.context_builder import build_series_context, build_comparison_context
+from rag.query_parsing import extract_year_range
+from tools.warehouse import Warehouse
+from tools.metrics import stage_timer, render_latest, LLM_TOKENS
+from tools.tracing import setup_tracing
+from tools.profiling import is_admin, monitor_event_loop, profile_path, profiled, profiling_middleware
+from llm.tokens import count_tokens
 import uvicorn
 import os
 from model.config_schema import (
@@ -22,28 +34,159 @@ from model.config_schema import (
 
 # --- CACHE DE METADADOS NO BACKEND ---
 # Usaremos um dicionário para cachear o DataFrame de metadados na memória.
-# Isso evita o custo de chamar ip.metadata() em todas as requisições.
+# Isso evita o custo de chamar ipea.metadata() em todas as requisições.
 app_state = {}
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Carrega o cache na inicialização do servidor
+# Espera inicial e máxima (backoff exponencial) entre as novas tentativas do aquecimento
+WARM_UP_RETRY_SECONDS = float(os.environ.get("WARM_UP_RETRY_SECONDS", "5"))
+WARM_UP_RETRY_MAX_SECONDS = float(os.environ.get("WARM_UP_RETRY_MAX_SECONDS", "120"))
+# O LLM é um serviço externo: por padrão só é reportado no /ready, sem bloquear a
+# prontidão (a busca de séries e os gráficos funcionam sem ele)
+READY_REQUIRE_LLM = os.environ.get("READY_REQUIRE_LLM", "false").lower() in ("1", "true", "yes")
+
+
+def load_metadata_catalog() -> bool:
+    # Carrega o catálogo em memória e grava todos os metadados no Redis de uma vez
     print("Carregando metadados do IPEA para o cache...")
-    app_state["metadata_df"] = ip.list_series()
+    app_state["metadata_df"] = prewarm_metadata()[["CODE", "NAME"]]
     print("✅ Cache de metadados carregado.")
+    return not app_state["metadata_df"].empty
+
+
+def warm_embedding_model() -> bool:
+    # A primeira chamada ao modelo paga a inicialização do torch; fazemos isso aqui
+    store.embed("aquecimento do modelo de embeddings")
+    count_tokens("aquecimento do encoder de tokens")
+    return True
+
+
+WARM_UP_STEPS = {
+    "metadata_catalog": load_metadata_catalog,
+    "embedding_model": warm_embedding_model,
+    "redis_index": lambda: store.index_present(),
+    "llm_providers": check_llm_providers,
+}
+
+
+def check_passed(name: str) -> bool:
+    value = app_state.get("readiness", {}).get(name)
+    return any(value.values()) if isinstance(value, dict) else bool(value)
+
+
+def failed_checks() -> List[str]:
+    """Verificações exigidas para a prontidão que ainda não passaram."""
+    required = [name for name in WARM_UP_STEPS if name != "llm_providers" or READY_REQUIRE_LLM]
+    return [name for name in required if not check_passed(name)]
+
+
+def warm_up():
+    """
+    Prepara o servidor antes de ele se declarar pronto: carrega os metadados,
+    aquece o modelo de embeddings e o encoder de tokens, verifica o índice no
+    Redis e a disponibilidade dos provedores de LLM.
+
+    Só refaz as verificações que ainda não passaram, e a falha de uma (o IPEA
+    ou um provedor de LLM fora do ar na subida) não impede as demais.
+    """
+    checks = app_state["readiness"]
+    for name, step in WARM_UP_STEPS.items():
+        if check_passed(name):
+            continue
+        try:
+            checks[name] = step()
+        except Exception as e:
+            print(f"⚠️ Aquecimento: falha em {name}: {e}")
+    print(f"Verificações do aquecimento: {checks}")
+
+
+async def warm_up_until_ready():
+    """Repete o aquecimento, com backoff exponencial, até todas as verificações exigidas passarem."""
+    delay = WARM_UP_RETRY_SECONDS
+    while True:
+        await asyncio.to_thread(warm_up)
+        failed = failed_checks()
+        if not failed:
+            return
+        print(f"⚠️ Servidor ainda não está pronto ({', '.join(failed)}); nova tentativa em {delay:.0f}s.")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARM_UP_RETRY_MAX_SECONDS)
+
+
+def is_ready() -> bool:
+    return not failed_checks()
+
+
+METADATA_REFRESH_SECONDS = int(os.environ.get("METADATA_REFRESH_SECONDS", "86400"))
+
+
+async def refresh_metadata_periodically():
+    """Atualiza o catálogo e os hashes de metadados a cada METADATA_REFRESH_SECONDS."""
+    while True:
+        await asyncio.sleep(METADATA_REFRESH_SECONDS)
+        try:
+            metadata_df = await asyncio.to_thread(prewarm_metadata)
+            app_state["metadata_df"] = metadata_df[["CODE", "NAME"]]
+            app_state["readiness"]["metadata_catalog"] = not metadata_df.empty
+        except Exception as e:
+            print(f"⚠️ Falha ao atualizar os metadados; mantendo o catálogo atual: {e}")
+
+
+def _report_warm_up_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Falha no aquecimento; o servidor não ficará pronto: {task.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O aquecimento roda em segundo plano: /health responde logo, /ready só depois
+    app_state["readiness"] = {
+        "metadata_catalog": False,
+        "embedding_model": False,
+        "redis_index": False,
+        "llm_providers": {},
+    }
+    warm_up_task = asyncio.create_task(warm_up_until_ready())
+    warm_up_task.add_done_callback(_report_warm_up_failure)
+    loop_monitor_task = asyncio.create_task(monitor_event_loop())
+    background_tasks = [warm_up_task, loop_monitor_task]
+    if METADATA_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(refresh_metadata_periodically()))
     yield
      # Código que executa no desligamento (shutdown)
+    for task in background_tasks:
+        task.cancel()
     print("Limpando cache...")
     app_state.clear()
 
 app = FastAPI(title="IPEADATA-RAG-Redis-Backend-POC",lifespan=lifespan)
-store = RedisVectorStore()
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Profiling opt-in por requisição, restrito a quem tem PROFILING_ADMIN_TOKEN
+app.middleware("http")(profiling_middleware)
+setup_tracing(app)
+# Backend da busca vetorial escolhido por VECTOR_BACKEND (redis ou numpy)
+store = create_vector_store()
+ts_store = SeriesTimeSeriesStore()
+# O armazém analítico é opcional: só é usado se `tools.sync_warehouse` já foi executado
+warehouse = Warehouse.open()
 
 # --- Modelos Pydantic para validação ---
 class FindRequest(BaseModel):
     question: str
     top_k: int = 3
     
+class FindBatchRequest(BaseModel):
+    questions: List[str]
+    top_k: int = 3
+
+class QueryBatchItem(BaseModel):
+    question: str
+    sercodigo: str
+    related_codes: Optional[str] = None
+
+class QueryBatchRequest(BaseModel):
+    items: List[QueryBatchItem]
+    related_codes: Optional[str] = None  # padrão para itens sem related_codes
+
 class QueryRequest(BaseModel):
     question: str
     sercodigo: str   # optional direct series code
@@ -51,42 +194,6 @@ class QueryRequest(BaseModel):
     model_name: Optional[str] = "gpt-4o-mini" #llama3.2
 
 
-# --- NOVA FUNÇÃO APERFEIÇOADA PARA EXTRAIR DATAS ---
-def extract_year_range(text: str) -> Tuple[Optional[int], Optional[int]]:
-    """
-    Extrai um intervalo de anos de um texto de forma robusta.
-    Retorna (start_year, end_year).
-    """
-    text = text.lower()
-    start_year, end_year = None, None
-
-    # Padrão 1: Tenta encontrar "de [ano] a [ano]" ou "entre [ano] e [ano]"
-    patterns = [
-        r"de\s+(\d{4})\s+a\s+(\d{4})",
-        r"entre\s+(\d{4})\s+e\s+(\d{4})"
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            # Garante que o ano inicial é o menor
-            year1 = int(match.group(1))
-            year2 = int(match.group(2))
-            return min(year1, year2), max(year1, year2)
-
-    # Padrão 2 (Fallback): Encontra todos os anos de 4 dígitos
-    anos = re.findall(r'\b(19|20)\d{2}\b', text)
-    anos = sorted([int(ano) for ano in anos])
-
-    if len(anos) >= 2:
-        # Usa o menor e o maior ano encontrado
-        start_year, end_year = anos[0], anos[-1]
-    elif len(anos) == 1:
-        # Se apenas um ano for encontrado, o intervalo é esse próprio ano
-        start_year, end_year = anos[0], anos[0]
-
-    return start_year, end_year
-
-
 # --- NOVA FUNÇÃO HELPER: Para extrair texto com Tika ---
 def extract_text_from_file(file: UploadFile) -> str:
     """
@@ -122,6 +229,7 @@ def extract_text_from_file(file: UploadFile) -> str:
 
 # --- NOVO ENDPOINT: /find_series ---
 @app.post("/find_series")
+@profiled
 def find_series(req: FindRequest):
     """
     Etapa 1: Recebe uma pergunta e retorna uma lista de séries candidatas.
@@ -130,173 +238,352 @@ def find_series(req: FindRequest):
         # Assumindo que você implementou a busca por código de série
         # A busca precisa retornar sercodigo, nome e score.
         # Você precisará ajustar sua função de busca no Redis para isso.
-        series_found = store.knn_search_for_series_code(req.question, k=req.top_k)
+        with stage_timer("find_series", "total"):
+            series_found = store.knn_search_for_series_code(req.question, k=req.top_k)
         return {"series": series_found}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/query")
+@profiled
 def query(
         question: str = Form(...),
     sercodigo: str = Form(...),
     use_model: str = Form(...),
     model_name: str = Form(...),
-    attachment: Optional[UploadFile] = File(None) # O anexo é opcional
+    attachment: Optional[UploadFile] = File(None), # O anexo é opcional
+    related_codes: Optional[str] = Form(None) # Códigos separados por vírgula para comparação
 ):
     """
     Etapa 2: Recebe uma série confirmada, busca os dados, cria o contexto e consulta o LLM.
     """
     try:
-        # ETAPA 1: Processar o anexo, se houver
-        attachment_context = ""
-        if attachment:
-            print(f"Processando anexo: {attachment.filename}")
-            attachment_context = extract_text_from_file(attachment)
+        with stage_timer("query", "total"):
+            # ETAPA 1: Processar o anexo, se houver
+            attachment_context = ""
+            if attachment:
+                print(f"Processando anexo: {attachment.filename}")
+                with stage_timer("query", "tika"):
+                    attachment_text = extract_text_from_file(attachment)
+                # Apenas os trechos relevantes para a pergunta entram no prompt
+                with stage_timer("query", "attachment_rag"):
+                    attachment_context = build_attachment_context(store, attachment_text, question)
+
+            # ETAPA 2: Dados da série e contexto
+            nome_serie = load_series_for_query(sercodigo)
+            context = build_query_context(question, sercodigo, nome_serie, related_codes)
+
+            # ETAPA 3: Combinar os contextos e consultar o LLM
+            llm_answer = answer_with_context(context, attachment_context)
+
+            # Os dados do gráfico são servidos por /series/{sercodigo}/data,
+            # que a UI consulta em paralelo com esta chamada.
+            return {
+                "llm_text": llm_answer,
+                "context_used": context,
+            }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # 1. Buscar os dados completos da série no IPEA
-        df = ip.timeseries(sercodigo)
 
-        
-        if 'YEAR' in df.columns and 'MONTH' in df.columns and 'DAY' in df.columns:
-            # Constrói o índice de data a partir das colunas
-            df.index = pd.to_datetime(df[['YEAR', 'MONTH', 'DAY']], errors='coerce')
-        else:
-            # Assume o "Formato A" e apenas garante que o índice é datetime
-            df.index = pd.to_datetime(df.index, errors='coerce')
-        
-        # Remove quaisquer linhas onde a data não pôde ser convertida
-        df = df[df.index.notna()]
-        
-        if df.empty:
-            # Verificação antecipada para o caso de a série inteira ser vazia
-            raise ValueError(f"A série {sercodigo} não retornou dados válidos do IPEA.")
-            
-        meta = ip.metadata(sercodigo)
-        nome_serie = meta['NAME'].iloc[0] if not meta.empty else sercodigo
+def load_series_for_query(sercodigo: str, endpoint: str = "query") -> str:
+    """Garante a série no RedisTimeSeries (só a primeira consulta vai ao IPEA) e devolve o nome dela."""
+    with stage_timer(endpoint, "timeseries_load"):
+        ts_store.ensure_series(sercodigo)
+
+    with stage_timer(endpoint, "metadata"):
+        meta = get_metadata_by_sercodigo(sercodigo)
+    return meta['NAME'] if meta else sercodigo
 
-        
-        print("\n--- INICIANDO ETAPA DE FILTRAGEM DE DATAS ---")
 
-	 # --- USA A NOVA FUNÇÃO DE EXTRAÇÃO DE DATAS ---
+def read_frames(sercodigo: str, start: Optional[pd.Timestamp] = None,
+                end: Optional[pd.Timestamp] = None) -> Dict[str, pd.Series]:
+    """get_frames que grava a série de novo se ela sumiu do Redis depois do ensure_series."""
+    frames = ts_store.get_frames(sercodigo, start, end)
+    if frames is None:
+        ts_store.ensure_series(sercodigo)
+        frames = ts_store.get_frames(sercodigo, start, end)
+    if frames is None:
+        raise HTTPException(status_code=404, detail=f"Série {sercodigo} não encontrada no RedisTimeSeries.")
+    return frames
+
+
+def build_query_context(question: str, sercodigo: str, nome_serie: str,
+                        related_codes: Optional[str] = None, endpoint: str = "query") -> str:
+    """Contexto da série para a pergunta: período pedido, agregações e comparação entre séries."""
+    print("\n--- INICIANDO ETAPA DE FILTRAGEM DE DATAS ---")
+
+    # --- USA A NOVA FUNÇÃO DE EXTRAÇÃO DE DATAS ---
+    with stage_timer(endpoint, "date_parsing"):
         start_year, end_year = extract_year_range(question)
+    frames = None
 
+    with stage_timer(endpoint, "timeseries_range"):
         if start_year:
             print(f"Período de datas encontrado na pergunta: {start_year} a {end_year}")
-            
-            # Log do intervalo de datas do DataFrame ANTES do filtro
-            print(f"Intervalo de datas do DataFrame original: {df.index.min().year} a {df.index.max().year}")
-            
-            # Aplica o filtro
-            df_filtered = df[(df.index.year >= start_year) & (df.index.year <= end_year)]
-            
-            print(f"Tamanho do DataFrame original: {len(df)} linhas")
-            print(f"Tamanho do DataFrame após o filtro: {len(df_filtered)} linhas")
+
+            # O filtro é feito no Redis (TS.MRANGE), junto com as agregações do período
+            frames = read_frames(
+                sercodigo,
+                pd.Timestamp(year=start_year, month=1, day=1),
+                pd.Timestamp(year=end_year, month=12, day=31),
+            )
+            print(f"Tamanho da série após o filtro: {len(frames['original'])} linhas")
+            if frames['original'].empty:
+                print("O período não tem observações; usando a série completa.")
+                frames = None
         else:
             # Caso nenhum período de data seja encontrado na pergunta
             print("Nenhum período de datas válido (ex: 'entre 2010 e 2020') foi encontrado na pergunta.")
             print("Usando a série completa.")
-            df_filtered = df
 
-        print("--- FILTRAGEM DE DATAS CONCLUÍDA ---\n")
+        if frames is None:
+            frames = read_frames(sercodigo)
 
-        # 3. Construção do contexto e resposta
-        if df_filtered.empty:
-            context = create_context_for_llm(df, nome_serie, sercodigo, question)
-        else:
-            context = create_context_for_llm(df_filtered, nome_serie, sercodigo, question)
-
-        # ETAPA 3: Combinar os dois contextos em um só
-        final_context = ""
-        if attachment_context:
-            final_context += "--- CONTEXTO DO DOCUMENTO ANEXADO ---\n"
-            final_context += attachment_context
-            final_context += "\n--- FIM DO DOCUMENTO ANEXADO ---\n\n"
-        
-        final_context += "--- CONTEXTO DA BASE DE DADOS IPEA ---\n"
-        final_context += context
-        final_context += "\n--- FIM DA BASE DE DADOS IPEA ---"
+    print("--- FILTRAGEM DE DATAS CONCLUÍDA ---\n")
 
-        # 4. Chamar o LLM com o novo contexto (sua lógica de chamada do LLM aqui)
-        # llm_answer = call_your_llm_function(question, context, model_name)
+    # 3. Construção do contexto e resposta
+    with stage_timer(endpoint, "context"):
+        context = create_context_for_llm(frames, nome_serie, sercodigo, question)
+
+    # Comparação entre séries, calculada no armazém DuckDB/Parquet quando disponível
+    if related_codes and warehouse is not None:
+        codes = [sercodigo] + [c.strip() for c in related_codes.split(",") if c.strip() and c.strip() != sercodigo]
+        with stage_timer(endpoint, "warehouse"):
+            comparison = build_comparison_context(warehouse, codes, start_year, end_year)
+        if comparison:
+            context += "\n\n" + comparison
+    return context
+
+
+def answer_with_context(context: str, attachment_context: str = "", endpoint: str = "query"):
+    """Monta o prompt final (anexo + base IPEA) e consulta o LLM."""
+    final_context = ""
+    if attachment_context:
+        final_context += "--- CONTEXTO DO DOCUMENTO ANEXADO ---\n"
+        final_context += attachment_context
+        final_context += "\n--- FIM DO DOCUMENTO ANEXADO ---\n\n"
+
+    final_context += "--- CONTEXTO DA BASE DE DADOS IPEA ---\n"
+    final_context += context
+    final_context += "\n--- FIM DA BASE DE DADOS IPEA ---"
+
+    # 4. Chamar o LLM com o novo contexto (sua lógica de chamada do LLM aqui)
+    with stage_timer(endpoint, "llm"):
         llm_answer = generate_answer(final_context)
-        #llm_answer = f"Resposta simulada do LLM para a pergunta '{question}' sobre a série '{nome_serie}' com base nos dados fornecidos." # Placeholder
-
-        # 5. Preparar dados para o gráfico
-        df_chart_data = df.iloc[:, [-1]]
-        df_chart_data = df_chart_data.reset_index()
-        df_chart_data.replace([np.inf, -np.inf, np.nan], None, inplace=True)
-        df_chart_data.columns = ['date', 'value']
-        chart_data = df_chart_data.to_dict(orient='records')
-        
-        return {
-            "llm_text": llm_answer,
-            "context_used": context,
-            "chart_data": chart_data,
-        }
+    LLM_TOKENS.labels("prompt").inc(count_tokens(final_context))
+    LLM_TOKENS.labels("completion").inc(count_tokens(str(llm_answer)))
+    return llm_answer
+
+
+# --- ENDPOINTS EM LOTE ---
+# Respostas em NDJSON: uma linha por pergunta, na ordem em que ficam prontas,
+# com o campo "index" apontando para a posição da pergunta no pedido.
+FIND_BATCH_CHUNK = int(os.environ.get("FIND_BATCH_CHUNK", "64"))
+QUERY_BATCH_LLM_CONCURRENCY = int(os.environ.get("QUERY_BATCH_LLM_CONCURRENCY", "4"))
+QUERY_BATCH_MAX_ITEMS = int(os.environ.get("QUERY_BATCH_MAX_ITEMS", "500"))
+
+
+def _ndjson(payload: dict) -> bytes:
+    return orjson.dumps(payload, default=str) + b"\n"
+
+
+@app.post("/find_series/batch")
+def find_series_batch(req: FindBatchRequest):
+    """
+    Busca de séries para várias perguntas: um encode por bloco de FIND_BATCH_CHUNK
+    perguntas e as buscas KNN do bloco em um único pipeline do Redis.
+    """
+    if len(req.questions) > QUERY_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {QUERY_BATCH_MAX_ITEMS} perguntas por lote.")
+
+    def results():
+        for offset in range(0, len(req.questions), FIND_BATCH_CHUNK):
+            chunk = req.questions[offset:offset + FIND_BATCH_CHUNK]
+            try:
+                with stage_timer("find_series_batch", "total"):
+                    found = store.knn_search_for_series_batch(chunk, k=req.top_k)
+            except Exception as e:
+                for i in range(len(chunk)):
+                    yield _ndjson({"index": offset + i, "error": str(e)})
+                continue
+            for i, series in enumerate(found):
+                yield _ndjson({"index": offset + i, "series": series})
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/query/batch")
+async def query_batch(req: QueryBatchRequest):
+    """
+    Várias perguntas de uma vez. Cada série distinta é carregada uma única vez e
+    compartilhada entre as perguntas; as chamadas ao LLM rodam com no máximo
+    QUERY_BATCH_LLM_CONCURRENCY em paralelo.
+    """
+    if len(req.items) > QUERY_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {QUERY_BATCH_MAX_ITEMS} perguntas por lote.")
+
+    async def results():
+        names: Dict[str, str] = {}
+        failures: Dict[str, str] = {}
+        for sercodigo in dict.fromkeys(item.sercodigo for item in req.items):
+            try:
+                names[sercodigo] = await asyncio.to_thread(load_series_for_query, sercodigo, "query_batch")
+            except Exception as e:
+                failures[sercodigo] = str(e)
+
+        llm_slots = asyncio.Semaphore(QUERY_BATCH_LLM_CONCURRENCY)
+
+        def answer(item: QueryBatchItem) -> dict:
+            related = item.related_codes or req.related_codes
+            context = build_query_context(item.question, item.sercodigo, names[item.sercodigo], related, "query_batch")
+            return {"llm_text": answer_with_context(context, endpoint="query_batch"), "context_used": context}
+
+        async def run(index: int, item: QueryBatchItem) -> dict:
+            if item.sercodigo in failures:
+                return {"index": index, "sercodigo": item.sercodigo, "error": failures[item.sercodigo]}
+            async with llm_slots:
+                try:
+                    result = await asyncio.to_thread(answer, item)
+                except Exception as e:
+                    return {"index": index, "sercodigo": item.sercodigo, "error": str(e)}
+            return {"index": index, "sercodigo": item.sercodigo, **result}
+
+        tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(req.items)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield _ndjson(await finished)
+        finally:
+            # Cliente desconectou: não adianta continuar chamando o LLM
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+def create_context_for_llm(frames: Dict[str, pd.Series], nome_serie: str, sercodigo: str, question: str) -> str:
+    """
+    Função auxiliar para criar o contexto em texto a partir da série e das
+    agregações lidas do RedisTimeSeries.
+    """
+    return build_series_context(frames["original"], nome_serie, sercodigo, question, rollups=frames)
+
+# --- ENDPOINT DE DADOS PARA O GRÁFICO ---
+SERIES_DATA_MAX_AGE = int(os.environ.get("SERIES_DATA_MAX_AGE", "3600"))
+
+@app.get("/series/{sercodigo}/data")
+@profiled
+def series_data(
+    sercodigo: str,
+    request: Request,
+    start: Optional[str] = Query(None, description="Data inicial (AAAA-MM-DD)"),
+    end: Optional[str] = Query(None, description="Data final (AAAA-MM-DD)"),
+    points: int = Query(1000, ge=3, le=20000, description="Número máximo de pontos"),
+):
+    """
+    Devolve a série em arrays colunares ({"date": [...], "value": [...]}),
+    reduzida no servidor com LTTB para no máximo `points` pontos.
+    """
+    # Datas inválidas são erro do pedido (422), não série inexistente (404)
+    try:
+        start_ts = pd.Timestamp(start) if start else None
+        end_ts = pd.Timestamp(end) if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Data inválida (use AAAA-MM-DD): {e}")
+    if start_ts is not None and end_ts is not None and start_ts > end_ts:
+        raise HTTPException(status_code=422, detail="A data inicial é posterior à data final.")
+
+    try:
+        with stage_timer("series_data", "timeseries_load"):
+            ts_store.ensure_series(sercodigo)
+        with stage_timer("series_data", "timeseries_range"):
+            series = ts_store.get_range(sercodigo, start_ts, end_ts)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def create_context_for_llm(df: pd.DataFrame, nome_serie: str, sercodigo: str, question: str) -> str:
-    """Função auxiliar para criar o contexto em texto a partir do DataFrame."""
-    
-    # Usar .iloc[0] para pegar o valor da primeira coluna, qualquer que seja o nome
-    initial_value = df.iloc[0, -1]
-    final_value = df.iloc[-1, -1]
-    initial_date = df.index[0].strftime('%Y-%m-%d')
-    final_date = df.index[-1].strftime('%Y-%m-%d')
-
-     # A lógica de resampling também usa a última coluna.
-    resampled_df = df.iloc[:, [-1]].resample('A')
-    resampled_df = resampled_df.mean()
-    
-    contexto = (
-        f"Você é um assistente de análise de dados.\n\n"
-        f'PERGUNTA DO USUÁRIO: "{question}"\n\n'
-        f"Responda à pergunta do usuário com base no seguinte contexto:\n\n"
-        f"Série: {nome_serie} ({sercodigo})\n"
-        f"Período de Análise: de {initial_date} a {final_date}\n\n"
-        "Resumo da Evolução:\n"
-        f"- Valor Inicial: {initial_value:.2f} em {initial_date}\n"
-        f"- Valor Final: {final_value:.2f} em {final_date}\n\n"
-        "Dados Pontuais (amostra):\n"
-        # Usar to_markdown para uma tabela bem formatada que o LLM entende bem
-        f"{resampled_df.to_markdown()}"
-    )
-    return contexto
+    with stage_timer("series_data", "serialize"):
+        body = series_chart_payload(sercodigo, series, points)
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    headers = {"Cache-Control": f"public, max-age={SERIES_DATA_MAX_AGE}", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# --- LIVENESS E READINESS ---
+@app.get("/health")
+def health():
+    """Liveness: o processo está de pé e respondendo."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: o modelo foi aquecido, o catálogo de metadados foi carregado e
+    o índice existe no Redis; com READY_REQUIRE_LLM, também exige que ao menos
+    um provedor de LLM responda. As verificações que falharam na subida são
+    refeitas em segundo plano (warm_up_until_ready).
+    """
+    checks = app_state.get("readiness", {})
+    if checks.get("embedding_model"):
+        # O índice pode ser removido em tempo de execução; é barato verificar de novo
+        checks["redis_index"] = store.index_present()
+    body = {"status": "ready" if is_ready() else "warming_up", "checks": checks}
+    return JSONResponse(body, status_code=200 if is_ready() else 503)
+
+
+# --- MÉTRICAS NO FORMATO DO PROMETHEUS ---
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
+# --- PROFILES DAS REQUISIÇÕES (ADMIN) ---
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, request: Request):
+    """Relatório de uma requisição perfilada (id retornado em X-Profile-Id)."""
+    if not is_admin(request.headers.get("x-profile")):
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores.")
+    path = profile_path(profile_id)
+    if not profile_id.isalnum() or not path.exists():
+        raise HTTPException(status_code=404, detail="Profile não encontrado.")
+    return Response(content=path.read_text(encoding="utf-8"), media_type="text/plain; charset=utf-8")
+
 
 # --- NOVO ENDPOINT PARA OBTER SÉRIES INDEXADAS ---
 @app.get("/indexed_series")
+@profiled
 def get_indexed_series():
     """
     Replica a lógica do script bash para obter os códigos únicos das séries
     indexadas no Redis e os enriquece com seus nomes.
     """
     try:
-        # 1. Obter todos os códigos únicos do Redis (equivalente a `redis-cli --scan | sed | sort -u`)
-        # Usar um set garante a unicidade e é muito eficiente.
-        indexed_codes = set()
-        # O prefixo deve corresponder ao que você usa no RedisVectorStore
-        for key in store.r.scan_iter("doc:ipea:*"):
-            # Ex: 'doc:ipea:ABATE_ABPEAV:1970-01-01T00:00:00' -> 'ABATE_ABPEAV'
-            parts = key.decode('utf-8').split(':')
-            if len(parts) > 2:
-                indexed_codes.add(parts[2])
-
-        if not indexed_codes:
-            return {"series": [], "total": 0}
-
-        # 2. Usar o DataFrame de metadados em cache para obter os nomes
-        metadata_df = app_state.get("metadata_df")
-        if metadata_df is None or metadata_df.empty:
-             raise HTTPException(status_code=500, detail="Cache de metadados não está disponível.")
-
-        # Filtra o DataFrame para conter apenas as séries que encontramos no Redis
-        filtered_df = metadata_df[metadata_df['CODE'].isin(indexed_codes)]
-
-        # 3. Formata os dados para a resposta JSON
-        result_df = filtered_df[['NAME','CODE']].copy()
-        result_df.rename(columns={'NAME': 'nome', 'CODE': 'código'}, inplace=True)
+        with stage_timer("indexed_series", "redis_scan"):
+            # 1. Obter os códigos únicos do índice (no Redis, equivalente a `redis-cli --scan | sed | sort -u`)
+            indexed_codes = store.indexed_codes()
+
+            if not indexed_codes:
+                return {"series": [], "total": 0}
+
+        with stage_timer("indexed_series", "metadata_join"):
+            # 2. Usar o DataFrame de metadados em cache para obter os nomes
+            metadata_df = app_state.get("metadata_df")
+            if metadata_df is None or metadata_df.empty:
+                 raise HTTPException(status_code=500, detail="Cache de metadados não está disponível.")
+
+            # Filtra o DataFrame para conter apenas as séries que encontramos no Redis
+            filtered_df = metadata_df[metadata_df['CODE'].isin(indexed_codes)]
+
+            # 3. Formata os dados para a resposta JSON
+            result_df = filtered_df[['NAME','CODE']].copy()
+            result_df.rename(columns={'NAME': 'nome', 'CODE': 'código'}, inplace=True)
         
         series_list = result_df.to_dict(orient='records')
 
@@ -1,15 +1,17 @@
 import os
-from redis import Redis
 from pydantic import BaseModel, Field
 from typing import Optional
 from dotenv import load_dotenv, find_dotenv
 
 load_dotenv(find_dotenv())
 
+from tools.redis_pool import get_redis  # noqa: E402 (depois do .env, que pode definir REDIS_*)
+
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
-REDIS_CLIENT = Redis(host=REDIS_HOST,port=REDIS_PORT)
-REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+# Sem REDIS_HOST, usa o mesmo REDIS_URL (e o mesmo pool) do resto do backend
+REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}" if REDIS_HOST else os.getenv("REDIS_URL", "redis://localhost:8999")
+REDIS_CLIENT = get_redis(REDIS_URL)
 TIKA_SERVER_ENDPOINT = os.getenv("TIKA_SERVER_ENDPOINT")
 
 API_HOST = os.getenv("API_HOST")
@@ -0,0 +1,77 @@
+# backend/rag/attachment.py
+import os
+from typing import List
+
+import numpy as np
+
+from model.split_text import SplitText
+from llm.tokens import count_tokens
+
+ATTACHMENT_TOKEN_BUDGET = int(os.environ.get("ATTACHMENT_TOKEN_BUDGET", "3000"))
+# Em tokens; o all-MiniLM-L6-v2 trunca entradas com mais de 256 (max_seq_length)
+ATTACHMENT_CHUNK_SIZE = int(os.environ.get("ATTACHMENT_CHUNK_SIZE", "256"))
+PASSAGE_SEPARATOR = "\n[...]\n"
+
+
+class AttachmentIndex:
+    """
+    Conjunto vetorial em memória, válido apenas durante uma requisição, com os
+    trechos de um documento anexado.
+
+    O texto extraído pelo Tika é dividido com `SplitText`, os trechos são
+    embedados em lote com o modelo já carregado no `RedisVectorStore` e apenas
+    os mais relevantes para a pergunta são devolvidos.
+    """
+
+    def __init__(self, store, chunk_size: int = ATTACHMENT_CHUNK_SIZE):
+        self.store = store
+        # Um trecho maior que a janela do modelo teria o final ignorado no embedding
+        self.chunk_size = min(chunk_size, store.model.max_seq_length)
+        self.chunks: List[str] = []
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+    def add_text(self, text: str) -> int:
+        chunks = [c for c in SplitText(self.chunk_size).split_text(text) if c.strip()]
+        if not chunks:
+            return 0
+        vectors = self.store.embed_batch(chunks)
+        # Normaliza uma única vez para que a similaridade seja um produto escalar
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+        self.chunks = chunks
+        return len(chunks)
+
+    def top_passages(self, question: str, token_budget: int = ATTACHMENT_TOKEN_BUDGET) -> List[str]:
+        """
+        Retorna os trechos mais similares à pergunta que cabem no orçamento de
+        tokens, na ordem em que aparecem no documento.
+        """
+        if not self.chunks:
+            return []
+
+        q_vec = self.store.embed(question)
+        q_vec = q_vec / (np.linalg.norm(q_vec) or 1)
+        scores = self.vectors @ q_vec
+
+        selected, used = [], 0
+        for idx in np.argsort(-scores):
+            cost = count_tokens(self.chunks[idx])
+            if used + cost > token_budget:
+                continue
+            selected.append(int(idx))
+            used += cost
+        return [self.chunks[i] for i in sorted(selected)]
+
+
+def build_attachment_context(store, text: str, question: str, token_budget: int = ATTACHMENT_TOKEN_BUDGET) -> str:
+    """
+    Reduz o texto de um anexo aos trechos relevantes para a pergunta.
+
+    Documentos que já cabem no orçamento são devolvidos inteiros, sem embeddings.
+    """
+    if not text or count_tokens(text) <= token_budget:
+        return text
+
+    index = AttachmentIndex(store)
+    index.add_text(text)
+    return PASSAGE_SEPARATOR.join(index.top_passages(question, token_budget))
@@ -0,0 +1,60 @@
+# backend/rag/batching.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+from tools.metrics import EMBED_MICROBATCH_SIZE
+
+
+class MicroBatchEmbedder:
+    """
+    Junta pedidos de embedding concorrentes em uma única chamada ao modelo.
+
+    Cada `submit` entra em uma fila; uma thread dedicada espera até `max_wait_ms`
+    após o primeiro pedido (ou até juntar `max_batch` textos), chama `encode_fn`
+    uma vez com o lote e resolve o Future de cada chamador com o seu vetor.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch: int = 32, max_wait_ms: float = 2.0):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embed-microbatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _collect(self) -> Sequence[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            EMBED_MICROBATCH_SIZE.observe(len(batch))
+            try:
+                vectors = self.encode_fn([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vec in zip(batch, vectors):
+                future.set_result(vec)
@@ -0,0 +1,188 @@
+# backend/rag/context_builder.py
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from llm.tokens import count_tokens
+from tools.downsampling import lttb
+
+SERIES_CONTEXT_TOKEN_BUDGET = int(os.environ.get("SERIES_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Da mais fina para a mais grossa: (nome, regra de resample do pandas, formato da data)
+RESOLUTIONS: List[Tuple[str, Optional[str], str]] = [
+    ("original", None, "%Y-%m-%d"),
+    ("mensal", "ME", "%Y-%m"),
+    ("trimestral", "QE", "%Y-T{q}"),
+    ("anual", "YE", "%Y"),
+]
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}"
+
+
+def _fmt_date(ts: pd.Timestamp, date_format: str) -> str:
+    return ts.strftime(date_format.replace("{q}", str(ts.quarter)))
+
+
+def resample_series(series: pd.Series, rule: Optional[str]) -> pd.Series:
+    """Média por período; `rule=None` devolve a série original."""
+    if rule is None:
+        return series
+    return series.resample(rule).mean().dropna()
+
+
+def series_statistics(series: pd.Series, annual: pd.Series) -> List[str]:
+    """
+    Estatísticas resumidas calculadas de forma vetorizada: variação no período,
+    taxa de crescimento anual composta, extremos, maiores variações anuais e
+    quebras de tendência.
+    """
+    values = series.to_numpy(dtype=np.float64)
+    first, last = values[0], values[-1]
+    first_date, last_date = series.index[0], series.index[-1]
+    lines = [
+        f"- Valor inicial: {_fmt(first)} em {first_date:%Y-%m-%d}",
+        f"- Valor final: {_fmt(last)} em {last_date:%Y-%m-%d}",
+    ]
+
+    if first != 0:
+        lines.append(f"- Variação no período: {_fmt((last / first - 1) * 100)}%")
+    years = (last_date - first_date).days / 365.25
+    if years >= 1 and first > 0 and last > 0:
+        lines.append(f"- Crescimento médio anual (CAGR): {_fmt(((last / first) ** (1 / years) - 1) * 100)}%")
+
+    i_min, i_max = int(np.argmin(values)), int(np.argmax(values))
+    lines.append(f"- Mínimo: {_fmt(values[i_min])} em {series.index[i_min]:%Y-%m-%d}")
+    lines.append(f"- Máximo: {_fmt(values[i_max])} em {series.index[i_max]:%Y-%m-%d}")
+    lines.append(f"- Média: {_fmt(values.mean())} | Desvio padrão: {_fmt(values.std())}")
+
+    growth = annual.pct_change().replace([np.inf, -np.inf], np.nan).dropna() * 100
+    if len(growth) >= 2:
+        lines.append(
+            f"- Maior alta anual: {_fmt(growth.max())}% em {growth.idxmax():%Y} | "
+            f"Maior queda anual: {_fmt(growth.min())}% em {growth.idxmin():%Y}"
+        )
+
+    # Quebra de tendência: maior mudança na taxa de crescimento de um ano para o seguinte
+    accel = growth.diff().abs().dropna()
+    if len(accel) >= 3:
+        breaks = accel.nlargest(3).sort_index()
+        lines.append("- Quebras de tendência: " + ", ".join(f"{ts:%Y}" for ts in breaks.index))
+
+    return lines
+
+
+def _render_table(series: pd.Series, date_format: str) -> str:
+    return "\n".join(
+        f"{_fmt_date(ts, date_format)};{_fmt(v)}" for ts, v in zip(series.index, series.to_numpy())
+    )
+
+
+def _choose_table(rollups: Dict[str, pd.Series], token_budget: int) -> Tuple[str, str]:
+    """
+    Escolhe a resolução mais fina cujo tamanho cabe no orçamento. Se nem a anual
+    couber, reduz a mais grossa com LTTB, preservando a forma da série.
+    """
+    candidates = []
+    seen_sizes = set()
+    for name, _, date_format in RESOLUTIONS:
+        frame = rollups[name]
+        if frame.empty or len(frame) in seen_sizes:
+            continue
+        seen_sizes.add(len(frame))
+        candidates.append((name, frame, date_format))
+
+    for name, frame, date_format in candidates:
+        table = _render_table(frame, date_format)
+        if count_tokens(table) <= token_budget:
+            return name, table
+
+    name, frame, date_format = candidates[-1]
+    tokens_per_line = max(count_tokens(_render_table(frame.iloc[:20], date_format)) / min(len(frame), 20), 1)
+    n_out = max(int(token_budget / tokens_per_line), 3)
+    x = frame.index.asi8.astype(np.float64)
+    idx = lttb(x, frame.to_numpy(dtype=np.float64), n_out)
+    return f"{name}, amostrada", _render_table(frame.iloc[idx], date_format)
+
+
+def build_series_context(
+    series: pd.Series,
+    nome_serie: str,
+    sercodigo: str,
+    question: str,
+    token_budget: int = SERIES_CONTEXT_TOKEN_BUDGET,
+    rollups: Optional[Dict[str, pd.Series]] = None,
+) -> str:
+    """
+    Monta o contexto numérico de uma série dentro de um orçamento de tokens.
+
+    Args:
+        series (pd.Series): Observações indexadas por data (NaN são descartados).
+        nome_serie (str): Nome da série.
+        sercodigo (str): Código da série.
+        question (str): Pergunta do usuário.
+        token_budget (int): Máximo de tokens para o contexto inteiro.
+        rollups (Optional[Dict[str, pd.Series]]): Agregações já calculadas por
+            resolução ("mensal", "trimestral", "anual"). As ausentes são
+            calculadas com resample do pandas.
+
+    Returns:
+        str: O contexto pronto para o prompt.
+    """
+    intro = (
+        f"Você é um assistente de análise de dados.\n\n"
+        f'PERGUNTA DO USUÁRIO: "{question}"\n\n'
+        f"Responda à pergunta do usuário com base no seguinte contexto:\n\n"
+        f"Série: {nome_serie} ({sercodigo})\n"
+    )
+    series = series.dropna()
+    if series.empty:
+        # Série só com valores ausentes: não há período, resumo nem tabela
+        return intro + "Observações: 0\n\nA série não tem observações válidas no período consultado."
+
+    rollups = dict(rollups or {})
+    for name, rule, _ in RESOLUTIONS:
+        if name not in rollups:
+            rollups[name] = resample_series(series, rule)
+
+    header = (
+        intro
+        + f"Período de Análise: de {series.index[0]:%Y-%m-%d} a {series.index[-1]:%Y-%m-%d}\n"
+        f"Observações: {len(series)}\n\n"
+        "Resumo da Evolução:\n"
+        + "\n".join(series_statistics(series, rollups["anual"]))
+        + "\n\n"
+    )
+
+    resolution, table = _choose_table(rollups, token_budget - count_tokens(header))
+    return header + f"Dados (resolução {resolution}; data;valor):\n{table}"
+
+
+def build_comparison_context(
+    warehouse,
+    codes: List[str],
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+    top: int = 10,
+) -> str:
+    """
+    Monta um ranking de crescimento entre séries, calculado pelo DuckDB no
+    armazém analítico (`tools.warehouse.Warehouse`).
+    """
+    ranking = warehouse.growth_ranking(codes, start_year, end_year, top=top)
+    if ranking.empty:
+        return ""
+    lines = [
+        f"{row.sercodigo};{row.nome};{row.ano_inicial}-{row.ano_final};"
+        f"{_fmt(row.valor_inicial)};{_fmt(row.valor_final)};"
+        + (f"{_fmt(row.crescimento_pct)}%" if pd.notna(row.crescimento_pct) else "n/d")
+        for row in ranking.itertuples()
+    ]
+    return (
+        "Comparação entre séries relacionadas (média anual do primeiro e do último ano):\n"
+        "código;nome;período;valor inicial;valor final;crescimento\n"
+        + "\n".join(lines)
+    )
@@ -1,27 +1,200 @@
 # backend/rag/embedding.py
 from sentence_transformers import SentenceTransformer
 import numpy as np
-import redis
 import os
 import time
-from typing import List, Dict, Any, Optional
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Set
 
 # Importar classes necessárias para a busca em Redis
+import redis
 from redis.commands.search.field import TextField, VectorField
 from redis.commands.search.index_definition import IndexDefinition, IndexType
 from redis.commands.search.query import Query as RediSearchQuery
 from redis.exceptions import ResponseError, BusyLoadingError
 
+from rag.batching import MicroBatchEmbedder
+from rag.index_keys import DOC_PREFIX, INDEX_ALIAS, INDEX_NAME, _decode, index_identity
+from rag.ranking import dedupe_series_results
+from tools.metrics import stage_timer
+from tools.redis_pool import get_redis
+
 MODEL_NAME = os.environ.get("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2")
 EMBED_DIM = int(os.environ.get("EMBED_DIM", "384"))  # matches all-MiniLM-L6-v2
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:8999")
-INDEX_NAME = os.environ.get("REDIS_INDEX_NAME", "idx:ipea")
-DOC_PREFIX = os.environ.get("REDIS_DOC_PREFIX", "doc:ipea:")
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+# Configuração do campo vetorial: FLAT (exato) ou HNSW (aproximado); FLOAT32 ou FLOAT16
+VECTOR_ALGORITHM = os.environ.get("REDIS_VECTOR_ALGORITHM", "FLAT")
+VECTOR_DTYPE = os.environ.get("REDIS_VECTOR_DTYPE", "FLOAT32")
+HNSW_M = int(os.environ.get("REDIS_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("REDIS_HNSW_EF_CONSTRUCTION", "200"))
+
+# Micro-batching das consultas: pedidos concorrentes são agrupados por até
+# EMBED_MICROBATCH_WAIT_MS (0 desliga e volta a uma chamada ao modelo por pedido)
+EMBED_MICROBATCH_WAIT_MS = float(os.environ.get("EMBED_MICROBATCH_WAIT_MS", "2"))
+EMBED_MICROBATCH_MAX = int(os.environ.get("EMBED_MICROBATCH_MAX", "32"))
+
+NUMPY_DTYPES = {"FLOAT32": np.float32, "FLOAT16": np.float16}
+# Campos que o layout normalizado não guarda nas observações
+LEGACY_FIELDS = ("text", "nome", "unidade", "vector")
+
+# Onde /find_series busca: "redis" (RediSearch) ou "numpy" (matriz mapeada em
+# memória no próprio processo, ver rag/mmap_store.py)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "redis")
+
+def _search_docs(res: Any) -> List[SimpleNamespace]:
+    """
+    Documentos de uma resposta de FT.SEARCH vinda de um pipeline. Conforme a
+    versão do redis-py e o protocolo, ela chega já interpretada (`Result`) ou
+    crua, em RESP2 (lista plana) ou RESP3 (dicionário).
+    """
+    if hasattr(res, "docs"):
+        return res.docs
+    docs = []
+    if isinstance(res, dict):
+        results = res.get("results", res.get(b"results", []))
+        for item in results:
+            fields = item.get("extra_attributes", item.get(b"extra_attributes", {}))
+            docs.append(SimpleNamespace(**{_decode(k): _decode(v) for k, v in fields.items()}))
+        return docs
+    # RESP2: [total, id1, [campo, valor, ...], id2, [...], ...]
+    for fields in res[2::2]:
+        docs.append(SimpleNamespace(**{_decode(k): _decode(v) for k, v in zip(fields[::2], fields[1::2])}))
+    return docs
+
+
+def create_vector_index(r: redis.Redis, index_name: str, prefix: str,
+                        algorithm: str = VECTOR_ALGORITHM, dtype: str = VECTOR_DTYPE) -> None:
+    """Cria o índice vetorial sobre as hashes de `prefix`, se ele ainda não existe."""
+    try:
+        r.ft(index_name).info()
+        return
+    except ResponseError:
+        pass
+    vector_params = {
+        "TYPE": dtype,
+        "DIM": EMBED_DIM,
+        "DISTANCE_METRIC": "COSINE"
+    }
+    if algorithm == "HNSW":
+        vector_params.update({"M": HNSW_M, "EF_CONSTRUCTION": HNSW_EF_CONSTRUCTION})
+    schema = (
+        TextField("text"),
+        TextField("sercodigo"),
+        TextField("date"),
+        TextField("value"),
+        VectorField("vector", algorithm, vector_params)
+    )
+    definition = IndexDefinition(prefix=[prefix], index_type=IndexType.HASH)
+    r.ft(index_name).create_index(fields=list(schema), definition=definition)
+
+
+def wait_indexed(r: redis.Redis, index_name: str, timeout: float = 600) -> None:
+    """Espera o RediSearch terminar de indexar as chaves já gravadas."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = r.ft(index_name).info()
+        if float(info.get("percent_indexed", 1)) >= 1 and int(info.get("indexing", 0)) == 0:
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"O índice {index_name} não terminou de indexar em {timeout}s.")
+
+
+class VectorStore(ABC):
+    """
+    Base dos backends de busca vetorial (VECTOR_BACKEND): o modelo de embeddings
+    e o micro-batching das consultas ficam aqui; cada backend implementa a busca
+    de séries sobre o seu índice. Um backend incompleto falha ao ser instanciado.
+    """
 
-class RedisVectorStore:
-    def __init__(self, redis_url: str = REDIS_URL):
-        self.r = redis.Redis.from_url(redis_url)
+    def __init__(self):
         self.model = SentenceTransformer(MODEL_NAME)
+        self.batcher = (
+            MicroBatchEmbedder(self._encode, EMBED_MICROBATCH_MAX, EMBED_MICROBATCH_WAIT_MS)
+            if EMBED_MICROBATCH_WAIT_MS > 0 else None
+        )
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=EMBED_MICROBATCH_MAX, convert_to_numpy=True)
+
+    def embed(self, text: str) -> np.ndarray:
+        # Simplificado, pois o modelo já produz a dimensão correta.
+        if self.batcher is not None:
+            return self.batcher.embed(text)
+        return self._encode([text])[0]
+
+    def embed_batch(self, texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        # Uma única chamada ao modelo para vários textos, em lotes de `batch_size`.
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+    def knn_search_for_series_code(self, query: str, k: int = 5, endpoint: str = "find_series") -> List[Dict[str, Any]]:
+        """
+        Busca as SÉRIES mais relevantes para uma pergunta, retornando códigos únicos.
+
+        Esta função é otimizada para a ETAPA 1 do fluxo de RAG de duas etapas.
+        Ela busca mais resultados do que o 'k' solicitado e depois os agrupa
+        para garantir que retornemos 'k' séries *distintas*.
+
+        Args:
+            query (str): A pergunta do usuário.
+            k (int): O número de séries únicas a serem retornadas.
+            endpoint (str): Rótulo das métricas de latência de cada etapa.
+
+        Returns:
+            List[Dict[str, Any]]: Uma lista de dicionários, cada um contendo
+                                  'sercodigo', 'nome', e 'score'.
+        """
+        # 1. Embedar a pergunta do usuário (nenhuma mudança aqui)
+        with stage_timer(endpoint, "embed"):
+            q_vec = self.embed(query)
+        return self.search_series_by_vector(q_vec, k, endpoint)
+
+    @abstractmethod
+    def search_series_by_vector(self, q_vec: np.ndarray, k: int = 5,
+                                endpoint: str = "find_series") -> List[Dict[str, Any]]:
+        """Séries únicas mais próximas de um vetor já embedado."""
+
+    @abstractmethod
+    def knn_search_for_series_batch(self, queries: List[str], k: int = 5,
+                                    endpoint: str = "find_series_batch") -> List[List[Dict[str, Any]]]:
+        """Busca de séries para várias perguntas, com um único encode."""
+
+    @abstractmethod
+    def indexed_codes(self) -> Set[str]:
+        """Códigos das séries presentes no índice."""
+
+    @abstractmethod
+    def index_present(self) -> bool:
+        """Se o índice existe e pode ser consultado."""
+
+
+class RedisVectorStore(VectorStore):
+    """
+    Sem `index_name`, o store segue o alias INDEX_ALIAS: busca por ele e grava no
+    índice (e prefixo) para o qual ele aponta. Na primeira execução o alias é
+    criado apontando para INDEX_NAME. Com `index_name` explícito (reindexação,
+    avaliação), o store usa só aquele índice.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = REDIS_URL,
+        index_name: Optional[str] = None,
+        prefix: Optional[str] = None,
+        algorithm: str = VECTOR_ALGORITHM,
+        dtype: str = VECTOR_DTYPE,
+        alias: str = INDEX_ALIAS,
+    ):
+        if dtype not in NUMPY_DTYPES:
+            raise ValueError(f"Tipo de vetor inválido '{dtype}'. Use um de {list(NUMPY_DTYPES)}.")
+        self.alias = alias if index_name is None else None
+        self.index_name = index_name or INDEX_NAME
+        self.prefix = prefix or DOC_PREFIX
+        self.algorithm = algorithm
+        self.dtype = dtype
+        self.r = get_redis(redis_url)
+        super().__init__()
         #self._ensure_index()
         # --- CORREÇÃO AQUI ---
         # Adiciona um loop de retentativa para esperar o Redis ficar pronto.
@@ -48,46 +221,106 @@ class RedisVectorStore:
         if retries == max_retries:
             raise Exception("❌ O Redis não ficou pronto a tempo. A aplicação será encerrada.")
 
-    
-    def _ensure_index(self):
+    @property
+    def search_name(self) -> str:
+        return self.alias or self.index_name
+
+    def refresh_live(self) -> bool:
+        """
+        Atualiza `index_name` e `prefix` com o índice para o qual o alias aponta
+        agora. Retorna False se o store não segue um alias ou se ele não existe.
+        """
+        if not self.alias:
+            return False
         try:
-            self.r.ft(INDEX_NAME).info()
+            info = self.r.ft(self.alias).info()
         except ResponseError:
-            # Cria o índice se ele não existir
-            schema = (
-                TextField("text"),
-                TextField("sercodigo"),
-                TextField("date"),
-                TextField("value"),
-                VectorField("vector", "FLAT", {
-                    "TYPE": "FLOAT32",
-                    "DIM": EMBED_DIM,
-                    "DISTANCE_METRIC": "COSINE"
-                })
-            )
-            definition = IndexDefinition(prefix=[DOC_PREFIX], index_type=IndexType.HASH)
-            self.r.ft(INDEX_NAME).create_index(
-                fields=list(schema),
-                definition=definition
-            )
+            return False
+        self.index_name, self.prefix = index_identity(info)
+        return True
+
+    def _ensure_index(self):
+        if self.refresh_live():
+            return
+        create_vector_index(self.r, self.index_name, self.prefix, self.algorithm, self.dtype)
+        if self.alias:
+            try:
+                self.r.ft(self.index_name).aliasadd(self.alias)
+            except ResponseError:
+                # Outro processo criou o alias ao mesmo tempo
+                if not self.refresh_live():
+                    raise
+
+    def wait_indexed(self, timeout: float = 600) -> None:
+        wait_indexed(self.r, self.index_name, timeout)
+
+    def indexed_codes(self) -> Set[str]:
+        # Prefixo do índice para o qual o alias aponta agora (muda a cada reindexação)
+        self.refresh_live()
+        codes = set()
+        for key in self.r.scan_iter(f"{self.prefix}*"):
+            # Ex: 'doc:ipea:ABATE_ABPEAV:1970-01-01' -> 'ABATE_ABPEAV'
+            code = key.decode('utf-8')[len(self.prefix):].split(':')[0]
+            if code:
+                codes.add(code)
+        return codes
+
+    def index_present(self) -> bool:
+        try:
+            self.r.ft(self.search_name).info()
+            return True
+        except Exception:
+            return False
 
     def _to_bytes(self, arr: np.ndarray) -> bytes:
-        return arr.astype(np.float32).tobytes()
+        return arr.astype(NUMPY_DTYPES[self.dtype]).tobytes()
 
     def _from_bytes(self, b: bytes) -> np.ndarray:
-        return np.frombuffer(b, dtype=np.float32)
+        return np.frombuffer(b, dtype=NUMPY_DTYPES[self.dtype])
 
-    def embed(self, text: str) -> np.ndarray:
-        # Simplificado, pois o modelo já produz a dimensão correta.
-        return self.model.encode([text], convert_to_numpy=True)[0]
+    def key(self, id_: str) -> str:
+        return f"{self.prefix}{id_}"
 
-    def add_doc(self, id_: str, text: str, meta: Dict[str, Any]):
-        vec = self.embed(text)
-        key = f"{DOC_PREFIX}{id_}"
+    def doc_mapping(self, text: str, meta: Dict[str, Any], vec: np.ndarray) -> Dict[str, Any]:
         mapping = {"text": text}
         mapping.update({k: str(v) for k, v in meta.items()})
         mapping["vector"] = self._to_bytes(vec)
-        self.r.hset(key, mapping=mapping)
+        return mapping
+
+    def add_doc(self, id_: str, text: str, meta: Dict[str, Any]):
+        vec = self.embed(text)
+        self.r.hset(self.key(id_), mapping=self.doc_mapping(text, meta, vec))
+
+    def add_docs(self, docs: List[Dict[str, Any]], batch_size: int = EMBED_BATCH_SIZE) -> int:
+        """
+        Indexa vários documentos ({"id", "text", "meta"}) com uma chamada em lote
+        ao modelo e um único pipeline de HSETs.
+        """
+        if not docs:
+            return 0
+        vectors = self.embed_batch([doc["text"] for doc in docs], batch_size)
+        pipe = self.r.pipeline(transaction=False)
+        for doc, vec in zip(docs, vectors):
+            pipe.hset(self.key(doc["id"]), mapping=self.doc_mapping(doc["text"], doc["meta"], vec))
+        pipe.execute()
+        return len(docs)
+
+    def add_records(self, records: List[Dict[str, Any]], batch_size: int = 10_000) -> int:
+        """
+        Grava documentos sem texto nem vetor ({"id", "meta"}), como as observações
+        do layout normalizado, em pipelines de `batch_size` HSETs.
+
+        O HSET mescla campos: antes dele, o HDEL remove os campos do layout antigo
+        que a chave possa ter, para que a observação saia da busca KNN.
+        """
+        pipe = self.r.pipeline(transaction=False)
+        for n, record in enumerate(records, start=1):
+            pipe.hdel(self.key(record["id"]), *LEGACY_FIELDS)
+            pipe.hset(self.key(record["id"]), mapping={k: str(v) for k, v in record["meta"].items()})
+            if n % batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+        return len(records)
 
     def knn_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         q_vec = self.embed(query)
@@ -97,7 +330,7 @@ class RedisVectorStore:
         base_q = f"*=>[KNN {k} @vector $vec AS score]"
         
         # Usar o objeto Query do redis-py para construir a busca
-        res = self.r.ft(INDEX_NAME).search(
+        res = self.r.ft(self.search_name).search(
             RediSearchQuery(base_q)
             .return_fields("text", "sercodigo", "date", "value", "score")
             .dialect(2),
@@ -117,26 +350,7 @@ class RedisVectorStore:
             out.append(d)
         return out
 
-    def knn_search_for_series_code(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """
-        Busca as SÉRIES mais relevantes para uma pergunta, retornando códigos únicos.
-
-        Esta função é otimizada para a ETAPA 1 do fluxo de RAG de duas etapas.
-        Ela busca mais resultados do que o 'k' solicitado e depois os agrupa
-        para garantir que retornemos 'k' séries *distintas*.
-
-        Args:
-            query (str): A pergunta do usuário.
-            k (int): O número de séries únicas a serem retornadas.
-
-        Returns:
-            List[Dict[str, Any]]: Uma lista de dicionários, cada um contendo
-                                  'sercodigo', 'nome', e 'score'.
-        """
-        # 1. Embedar a pergunta do usuário (nenhuma mudança aqui)
-        q_vec = self.embed(query)
-        q_bytes = self._to_bytes(q_vec)
-
+    def _series_query(self, k: int) -> RediSearchQuery:
         # 2. Construir a consulta de busca por vetor
         # Heurística: buscamos mais resultados (k * 10) para aumentar a
         # chance de encontrar k séries *únicas* entre os resultados.
@@ -145,45 +359,61 @@ class RedisVectorStore:
 
         # 3. Definir a consulta e os campos a serem retornados
         # ESTA É A MUDANÇA PRINCIPAL: Pedimos 'sercodigo', 'nome' e 'score'.
-        query_obj = (
+        return (
             RediSearchQuery(base_q)
             .sort_by("score")
             .return_fields("sercodigo", "nome", "score") # <<-- AQUI ESTÁ A MÁGICA
             .dialect(2)
         )
 
+    def knn_search_for_series_batch(self, queries: List[str], k: int = 5,
+                                    endpoint: str = "find_series_batch") -> List[List[Dict[str, Any]]]:
+        """
+        Versão em lote de `knn_search_for_series_code`: um único encode para todas
+        as perguntas e as buscas KNN enviadas em um pipeline.
+        """
+        if not queries:
+            return []
+        with stage_timer(endpoint, "embed"):
+            q_vecs = self.embed_batch(queries)
+        pipe = self.r.ft(self.search_name).pipeline(transaction=False)
+        for q_vec in q_vecs:
+            pipe.search(self._series_query(k), query_params={"vec": self._to_bytes(q_vec)})
+        with stage_timer(endpoint, "redis_search"):
+            results = pipe.execute()
+        return [dedupe_series_results(_search_docs(res), k) for res in results]
+
+    def search_series_by_vector(self, q_vec: np.ndarray, k: int = 5,
+                                endpoint: str = "find_series") -> List[Dict[str, Any]]:
+        """
+        Mesma busca de `knn_search_for_series_code`, a partir de um vetor já calculado.
+        Permite medir apenas a latência do índice (ver tools/eval_retrieval.py).
+        """
+        q_bytes = self._to_bytes(q_vec)
+
+        query_obj = self._series_query(k)
+
         # 4. Executar a busca
         try:
-            res = self.r.ft(INDEX_NAME).search(
-                query_obj,
-                query_params={"vec": q_bytes}
-            )
+            with stage_timer(endpoint, "redis_search"):
+                res = self.r.ft(self.search_name).search(
+                    query_obj,
+                    query_params={"vec": q_bytes}
+                )
         except Exception as e:
             print(f"Erro durante a busca no Redis: {e}")
             return []
 
         # 5. Processar e desduplicar os resultados
         # Isso é crucial, pois os N primeiros resultados podem ser da mesma série.
-        series_found = {}
-        for doc in res.docs:
-            code = doc.sercodigo
-            score = float(doc.score)
-            
-            # Se já encontramos k séries únicas e esta é uma nova, podemos ignorar.
-            if len(series_found) >= k and code not in series_found:
-                continue
-
-            # Adiciona a série se for nova ou se o score for melhor (menor) que o já salvo.
-            if code not in series_found or score < series_found[code]['score']:
-                series_found[code] = {
-                    "sercodigo": code,
-                    "nome": doc.nome,
-                    "score": score
-                }
-        
-        # 6. Formatar a saída final
-        # Converte o dicionário de séries únicas em uma lista e a ordena pelo score.
-        final_list = sorted(list(series_found.values()), key=lambda x: x['score'])
-        
-        # Garante que retornemos no máximo k resultados
-        return final_list[:k]
+        return dedupe_series_results(res.docs, k)
+
+
+def create_vector_store() -> VectorStore:
+    """Backend de busca escolhido por VECTOR_BACKEND: "redis" (padrão) ou "numpy" (rag/mmap_store.py)."""
+    if VECTOR_BACKEND == "numpy":
+        from rag.mmap_store import NumpyVectorStore
+        return NumpyVectorStore()
+    if VECTOR_BACKEND != "redis":
+        raise ValueError(f"VECTOR_BACKEND inválido '{VECTOR_BACKEND}'. Use 'redis' ou 'numpy'.")
+    return RedisVectorStore()
@@ -0,0 +1,69 @@
+# backend/rag/index_keys.py
+"""
+Nomes do índice vetorial e esquema de chaves dos documentos.
+
+Chaves canônicas (sempre montadas por estas funções):
+
+- série:      `{prefixo}{CODIGO}`
+- observação: `{prefixo}{CODIGO}:{AAAA-MM-DD}`
+
+Módulo sem dependências pesadas, para ser usado pelas ferramentas de
+manutenção (tools/reindex.py, tools/audit_index.py) sem carregar o modelo.
+"""
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+import redis
+from redis.exceptions import ResponseError
+
+INDEX_NAME = os.environ.get("REDIS_INDEX_NAME", "idx:ipea")
+DOC_PREFIX = os.environ.get("REDIS_DOC_PREFIX", "doc:ipea:")
+# As buscas vão para este alias, que aponta para o índice "vivo"; trocar de
+# versão é um FT.ALIASUPDATE (ver tools/reindex.py)
+INDEX_ALIAS = os.environ.get("REDIS_INDEX_ALIAS", "idx:ipea:live")
+
+
+def _decode(value: Any) -> Any:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def series_doc_id(sercodigo: str) -> str:
+    return str(sercodigo)
+
+
+def observation_doc_id(sercodigo: str, date: Any) -> str:
+    """
+    Id da observação: código e data no formato AAAA-MM-DD. Aceita Timestamp ou
+    texto ("2010-01-01", "2010-01-01T00:00:00-03:00"); a mesma observação gera
+    sempre o mesmo id, qualquer que seja o indexador.
+    """
+    return f"{sercodigo}:{pd.Timestamp(date).strftime('%Y-%m-%d')}"
+
+
+def index_identity(info: Dict[str, Any]) -> Tuple[str, str]:
+    """Nome real e prefixo de um índice, a partir do FT.INFO (que também aceita um alias)."""
+    definition = info["index_definition"]
+    if not isinstance(definition, dict):
+        definition = dict(zip(definition[::2], definition[1::2]))
+    definition = {_decode(k): v for k, v in definition.items()}
+    return _decode(info["index_name"]), _decode(definition["prefixes"][0])
+
+
+def vector_field(info: Dict[str, Any], name: str = "vector") -> Optional[Dict[str, Any]]:
+    """Parâmetros do campo vetorial (`data_type`, `dim`, ...) no FT.INFO, ou None se não aparecem."""
+    for attribute in info.get("attributes", []):
+        if not isinstance(attribute, dict):
+            attribute = dict(zip(attribute[::2], attribute[1::2]))
+        attribute = {_decode(k).lower(): _decode(v) for k, v in attribute.items()}
+        if attribute.get("identifier") == name and "data_type" in attribute:
+            return attribute
+    return None
+
+
+def live_index(r: redis.Redis, alias: str = INDEX_ALIAS) -> Optional[Tuple[str, str]]:
+    """(nome, prefixo) do índice para o qual o alias aponta, ou None se o alias não existe."""
+    try:
+        return index_identity(r.ft(alias).info())
+    except ResponseError:
+        return None
@@ -0,0 +1,101 @@
+# backend/rag/mmap_store.py
+"""
+Busca vetorial em processo, sobre uma matriz numpy mapeada em memória
+(VECTOR_BACKEND=numpy).
+
+O índice são dois arquivos, gerados por `python -m tools.vector_snapshot mmap`:
+
+- `{VECTOR_MMAP_PATH}.npy`: vetores float32 normalizados, um por linha;
+- `{VECTOR_MMAP_PATH}.json`: modelo, dimensão e `sercodigo`/`nome` de cada linha.
+
+A matriz é aberta com `np.load(mmap_mode="r")`: nada é copiado na subida e os
+workers do uvicorn compartilham as mesmas páginas do page cache. A busca é um
+produto matricial (similaridade de cosseno) sem ida ao Redis; serve bem ao
+catálogo no nível da série (layout normalizado), que cabe folgado em memória.
+"""
+import json
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List, Set
+
+import numpy as np
+
+from rag.embedding import EMBED_DIM, MODEL_NAME, VectorStore
+from rag.ranking import dedupe_series_results
+from tools.metrics import stage_timer
+
+VECTOR_MMAP_PATH = os.environ.get("VECTOR_MMAP_PATH", "vector_index/ipea")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def write_mmap_index(path: str, vectors: np.ndarray, docs: List[Dict[str, str]]) -> None:
+    """
+    Grava o índice em `{path}.npy` e `{path}.json`. Cada arquivo é escrito ao lado
+    e trocado com os.replace, para que um worker nunca abra um arquivo pela metade.
+    """
+    if len(vectors) != len(docs):
+        raise ValueError(f"{len(vectors)} vetores para {len(docs)} documentos.")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(f"{path}.tmp.npy", _normalize(vectors))
+    with open(f"{path}.tmp.json", "w", encoding="utf-8") as f:
+        json.dump({"model": MODEL_NAME, "dim": EMBED_DIM, "rows": len(docs), "docs": docs}, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp.npy", f"{path}.npy")
+    os.replace(f"{path}.tmp.json", f"{path}.json")
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self, path: str = VECTOR_MMAP_PATH):
+        super().__init__()
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["model"] != MODEL_NAME or meta["dim"] != EMBED_DIM:
+            raise ValueError(
+                f"Índice {path} gerado com {meta['model']} (dim {meta['dim']}), "
+                f"mas o backend usa {MODEL_NAME} (dim {EMBED_DIM})."
+            )
+        self.vectors = np.load(f"{path}.npy", mmap_mode="r")
+        if self.vectors.shape != (meta["rows"], EMBED_DIM):
+            raise ValueError(f"{path}.npy e {path}.json não correspondem; gere o índice novamente.")
+        self.docs = meta["docs"]
+        print(f"✅ Índice vetorial em memória: {len(self.docs)} vetores de {path}.npy.")
+
+    def _rank(self, distances: np.ndarray, k: int) -> List[Dict[str, Any]]:
+        # Mesma heurística da busca no Redis: k * 10 candidatos, depois séries únicas
+        n = min(k * 10, len(distances))
+        if n == 0:
+            return []
+        candidates = np.argpartition(distances, n - 1)[:n] if n < len(distances) else np.arange(n)
+        candidates = candidates[np.argsort(distances[candidates])]
+        return dedupe_series_results(
+            (SimpleNamespace(sercodigo=self.docs[i]["sercodigo"], nome=self.docs[i]["nome"], score=float(distances[i]))
+             for i in candidates),
+            k,
+        )
+
+    def search_series_by_vector(self, q_vec: np.ndarray, k: int = 5,
+                                endpoint: str = "find_series") -> List[Dict[str, Any]]:
+        with stage_timer(endpoint, "vector_search"):
+            # Distância de cosseno, como o score do RediSearch (menor é melhor)
+            distances = 1.0 - self.vectors @ _normalize(q_vec)
+        return self._rank(distances, k)
+
+    def knn_search_for_series_batch(self, queries: List[str], k: int = 5,
+                                    endpoint: str = "find_series_batch") -> List[List[Dict[str, Any]]]:
+        if not queries:
+            return []
+        with stage_timer(endpoint, "embed"):
+            q_vecs = self.embed_batch(queries)
+        with stage_timer(endpoint, "vector_search"):
+            distances = 1.0 - _normalize(q_vecs) @ self.vectors.T
+        return [self._rank(row, k) for row in distances]
+
+    def indexed_codes(self) -> Set[str]:
+        return {doc["sercodigo"] for doc in self.docs}
+
+    def index_present(self) -> bool:
+        return len(self.docs) > 0
@@ -0,0 +1,38 @@
+# backend/rag/query_parsing.py
+import re
+from typing import Optional, Tuple
+
+
+def extract_year_range(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Extrai um intervalo de anos de um texto de forma robusta.
+    Retorna (start_year, end_year).
+    """
+    text = text.lower()
+    start_year, end_year = None, None
+
+    # Padrão 1: Tenta encontrar "de [ano] a [ano]" ou "entre [ano] e [ano]"
+    patterns = [
+        r"de\s+(\d{4})\s+a\s+(\d{4})",
+        r"entre\s+(\d{4})\s+e\s+(\d{4})"
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            # Garante que o ano inicial é o menor
+            year1 = int(match.group(1))
+            year2 = int(match.group(2))
+            return min(year1, year2), max(year1, year2)
+
+    # Padrão 2 (Fallback): Encontra todos os anos de 4 dígitos
+    anos = re.findall(r'\b(19|20)\d{2}\b', text)
+    anos = sorted([int(ano) for ano in anos])
+
+    if len(anos) >= 2:
+        # Usa o menor e o maior ano encontrado
+        start_year, end_year = anos[0], anos[-1]
+    elif len(anos) == 1:
+        # Se apenas um ano for encontrado, o intervalo é esse próprio ano
+        start_year, end_year = anos[0], anos[0]
+
+    return start_year, end_year
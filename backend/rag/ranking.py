@@ -0,0 +1,30 @@
+# backend/rag/ranking.py
+from typing import Any, Dict, Iterable, List
+
+
+def dedupe_series_results(docs: Iterable[Any], k: int) -> List[Dict[str, Any]]:
+    """
+    Agrupa os resultados da busca vetorial (um por observação) em até `k` séries
+    distintas, mantendo o melhor (menor) score de cada uma, ordenadas pelo score.
+
+    Cada item de `docs` precisa ter os atributos `sercodigo`, `nome` e `score`,
+    como os documentos retornados pelo RediSearch.
+    """
+    series_found = {}
+    for doc in docs:
+        code = doc.sercodigo
+        score = float(doc.score)
+
+        # Se já encontramos k séries únicas e esta é uma nova, podemos ignorar.
+        if len(series_found) >= k and code not in series_found:
+            continue
+
+        # Adiciona a série se for nova ou se o score for melhor (menor) que o já salvo.
+        if code not in series_found or score < series_found[code]['score']:
+            series_found[code] = {
+                "sercodigo": code,
+                "nome": doc.nome,
+                "score": score
+            }
+
+    return sorted(series_found.values(), key=lambda x: x['score'])[:k]
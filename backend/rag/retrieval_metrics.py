@@ -0,0 +1,46 @@
+# backend/rag/retrieval_metrics.py
+from typing import Dict, Iterable, List, Sequence, Set
+
+import numpy as np
+
+
+def recall_at_k(ranked: Sequence[str], expected: Set[str], k: int) -> float:
+    """Fração dos códigos esperados que aparecem entre os `k` primeiros resultados."""
+    if not expected:
+        return 0.0
+    return len(expected.intersection(ranked[:k])) / len(expected)
+
+
+def reciprocal_rank(ranked: Sequence[str], expected: Set[str]) -> float:
+    """1/posição do primeiro código esperado no ranking, ou 0 se nenhum aparecer."""
+    for position, code in enumerate(ranked, start=1):
+        if code in expected:
+            return 1.0 / position
+    return 0.0
+
+
+def latency_percentiles(seconds: Iterable[float]) -> Dict[str, float]:
+    latencies = np.asarray(list(seconds), dtype=float) * 1000
+    if latencies.size == 0:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def summarize_run(
+    rankings: List[Sequence[str]],
+    expected: List[Set[str]],
+    latencies: List[float],
+    ks: Sequence[int] = (1, 5, 10),
+) -> Dict[str, float]:
+    """Médias de recall@k e MRR sobre o conjunto rotulado, mais os percentis de latência."""
+    summary = {
+        f"recall@{k}": round(float(np.mean([recall_at_k(r, e, k) for r, e in zip(rankings, expected)])), 4)
+        for k in ks
+    }
+    summary["mrr"] = round(float(np.mean([reciprocal_rank(r, e) for r, e in zip(rankings, expected)])), 4)
+    summary.update(latency_percentiles(latencies))
+    return summary
@@ -0,0 +1,221 @@
+# backend/tools/audit_index.py
+"""
+Auditoria e compactação do índice vetorial.
+
+Versões antigas gravavam a mesma observação com ids diferentes
+(`{CODIGO}:{posição}` em rag/retrieval.py, `{CODIGO}:{timestamp}` nos
+indexadores), então ela podia aparecer duas vezes na busca. Hoje todos usam
+`observation_doc_id` (rag/index_keys.py): `{CODIGO}:{AAAA-MM-DD}`.
+
+A auditoria percorre as chaves do índice vivo e aponta:
+
+- duplicatas: observações com o mesmo id canônico (mesma série e data);
+- órfãos: documentos sem `sercodigo`/`date` válidos ou, no layout
+  normalizado, observações sem vetor cuja série não tem documento próprio
+  (nunca aparecem na busca);
+- ids fora do formato canônico.
+
+Séries que saíram do catálogo do IPEA são mantidas, como no
+tools/migrate_layout.py. Com `--drop-uncataloged`, os códigos são conferidos
+contra o catálogo baixado do IPEA (nunca contra as chaves `meta:` do Redis, que
+podem cobrir só as séries já consultadas) e os de fora também viram órfãos.
+
+Com `--compact`, apaga duplicatas e órfãos em pipelines e renomeia as chaves
+restantes para o id canônico.
+
+Uso (a partir de backend/):
+
+    python -m tools.audit_index --top 20
+    python -m tools.audit_index --compact
+    python -m tools.audit_index --compact --drop-uncataloged
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+from tabulate import tabulate
+from tqdm import tqdm
+
+from rag.index_keys import _decode, index_identity, live_index, observation_doc_id, series_doc_id
+from tools.redis_pool import REDIS_URL, get_redis
+
+AUDIT_BATCH = 1000
+MB = 1024 * 1024
+
+
+def scan_docs(r: redis.Redis, prefix: str) -> List[Dict[str, Any]]:
+    """Campos de referência, presença do vetor e MEMORY USAGE de cada chave do prefixo."""
+    docs = []
+    keys = list(r.scan_iter(f"{prefix}*", count=AUDIT_BATCH))
+    for i in tqdm(range(0, len(keys), AUDIT_BATCH), desc="Lendo documentos"):
+        chunk = keys[i:i + AUDIT_BATCH]
+        pipe = r.pipeline(transaction=False)
+        for key in chunk:
+            pipe.hmget(key, "sercodigo", "date")
+            pipe.hexists(key, "vector")
+            pipe.memory_usage(key, samples=0)
+        replies = pipe.execute()
+        for n, key in enumerate(chunk):
+            (sercodigo, date), has_vector, size = replies[3 * n:3 * n + 3]
+            docs.append({
+                "key": _decode(key),
+                "sercodigo": _decode(sercodigo),
+                "date": _decode(date),
+                "has_vector": bool(has_vector),
+                "bytes": size or 0,
+            })
+    return docs
+
+
+def _canonical_id(doc: Dict[str, Any]) -> Optional[str]:
+    try:
+        return observation_doc_id(doc["sercodigo"], doc["date"])
+    except (TypeError, ValueError):
+        return None
+
+
+def plan_compaction(docs: Iterable[Dict[str, Any]], prefix: str,
+                    known_codes: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Decide, sem tocar no Redis, o que apagar e o que renomear.
+
+    Em cada grupo de duplicatas fica a chave que já é canônica ou, se nenhuma
+    for, a primeira em ordem alfabética, que é renomeada para o id canônico.
+    `known_codes` (séries do catálogo) é opcional; sem ele, séries desconhecidas
+    não são consideradas órfãs.
+    """
+    docs = list(docs)
+    series_docs: Dict[str, Dict[str, Any]] = {}
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    orphans: List[Dict[str, Any]] = []
+    for doc in docs:
+        doc_id = doc["key"][len(prefix):]
+        code = doc["sercodigo"] or doc_id.split(":")[0]
+        doc["code"] = code
+        if known_codes is not None and code not in known_codes:
+            orphans.append(doc)
+        elif ":" not in doc_id:
+            series_docs[code] = doc
+        else:
+            canonical = _canonical_id(doc)
+            if canonical is None:
+                orphans.append(doc)
+            else:
+                groups[canonical].append(doc)
+
+    delete: List[Dict[str, Any]] = list(orphans)
+    rename: List[tuple] = []
+    duplicates = 0
+    for canonical, group in groups.items():
+        canonical_key = f"{prefix}{canonical}"
+        keep = next((d for d in group if d["key"] == canonical_key), None) or min(group, key=lambda d: d["key"])
+        if not keep["has_vector"] and series_doc_id(keep["code"]) not in series_docs:
+            # Observação do layout normalizado sem o documento da série: invisível na busca
+            orphans.extend(group)
+            delete.extend(group)
+            continue
+        for doc in group:
+            if doc is not keep:
+                duplicates += 1
+                delete.append(doc)
+        if keep["key"] != canonical_key:
+            rename.append((keep["key"], canonical_key))
+
+    deleted_keys = {d["key"] for d in delete}
+    orphan_keys = {d["key"] for d in orphans}
+    duplicate_keys = deleted_keys - orphan_keys
+    per_series: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"docs": 0, "duplicates": 0, "orphans": 0, "bytes": 0})
+    for doc in docs:
+        stats = per_series[doc["code"]]
+        stats["docs"] += 1
+        stats["bytes"] += doc["bytes"]
+        stats["duplicates"] += doc["key"] in duplicate_keys
+        stats["orphans"] += doc["key"] in orphan_keys
+
+    return {
+        "delete": sorted(deleted_keys),
+        "rename": rename,
+        "duplicates": duplicates,
+        "orphans": len(orphan_keys),
+        "reclaim_bytes": sum(d["bytes"] for d in docs if d["key"] in deleted_keys),
+        "per_series": dict(per_series),
+    }
+
+
+def catalog_codes() -> Set[str]:
+    """Códigos do catálogo completo do IPEA."""
+    # Importado aqui: só é necessário com --drop-uncataloged
+    from tools.datasource import ipea
+
+    codes = set(ipea.metadata()["CODE"].dropna().astype(str))
+    if not codes:
+        raise RuntimeError("Catálogo do IPEA vazio; nenhuma série seria mantida.")
+    return codes
+
+
+def compact(r: redis.Redis, plan: Dict[str, Any]) -> None:
+    pipe = r.pipeline(transaction=False)
+    for n, key in enumerate(plan["delete"], start=1):
+        pipe.unlink(key)
+        if n % AUDIT_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+    for n, (old, new) in enumerate(plan["rename"], start=1):
+        # RENAMENX: nunca sobrescreve uma chave canônica gravada por um indexador nesse meio-tempo
+        pipe.renamenx(old, new)
+        if n % AUDIT_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def report(plan: Dict[str, Any], top: int) -> None:
+    rows = [
+        {"série": code, "docs": s["docs"], "duplicatas": s["duplicates"], "órfãos": s["orphans"],
+         "mb": round(s["bytes"] / MB, 2)}
+        for code, s in plan["per_series"].items()
+    ]
+    rows.sort(key=lambda row: row["mb"], reverse=True)
+    print(tabulate(rows[:top], headers="keys", tablefmt="github"))
+    print(
+        f"\n{len(rows)} séries, {sum(row['docs'] for row in rows)} documentos, "
+        f"{sum(row['mb'] for row in rows):.1f} MB; {plan['duplicates']} duplicatas, {plan['orphans']} órfãos, "
+        f"{len(plan['rename'])} ids fora do formato canônico; "
+        f"{plan['reclaim_bytes'] / MB:.1f} MB a liberar."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audita e compacta o índice vetorial.")
+    parser.add_argument("--index", help="Índice a auditar (padrão: o do alias)")
+    parser.add_argument("--top", type=int, default=20, help="Séries listadas, por memória")
+    parser.add_argument("--json", help="Grava o relatório por série neste arquivo")
+    parser.add_argument("--compact", action="store_true", help="Apaga duplicatas e órfãos e renomeia para o id canônico")
+    parser.add_argument("--drop-uncataloged", action="store_true",
+                        help="Considera órfãs as séries fora do catálogo do IPEA (baixa o catálogo)")
+    args = parser.parse_args()
+
+    r = get_redis(REDIS_URL)
+    if args.index:
+        index_name, prefix = index_identity(r.ft(args.index).info())
+    else:
+        index_name, prefix = live_index(r) or (None, None)
+        if index_name is None:
+            raise SystemExit("❌ O alias do índice não existe; informe --index.")
+    print(f"Auditando {index_name} ({prefix}*)...")
+
+    docs = scan_docs(r, prefix)
+    known = catalog_codes() if args.drop_uncataloged else None
+    plan = plan_compaction(docs, prefix, known)
+    report(plan, args.top)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(plan["per_series"], f, ensure_ascii=False, indent=2)
+
+    if args.compact:
+        compact(r, plan)
+        print(f"✅ {len(plan['delete'])} chaves apagadas e {len(plan['rename'])} renomeadas.")
+    elif plan["delete"] or plan["rename"]:
+        print("Rode com --compact para aplicar.")
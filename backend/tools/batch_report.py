@@ -0,0 +1,185 @@
+# backend/tools/batch_report.py
+"""
+Relatórios em lote: responde um arquivo de perguntas sem passar pela UI.
+
+Entrada em CSV (com cabeçalho) ou JSONL, com a coluna `question` e, opcionalmente,
+`id` (padrão: número da linha) e `sercodigo` (sem ele, a série é escolhida pela
+busca vetorial, como no /find_series):
+
+    id,question,sercodigo
+    1,Como evoluiu o abate de frangos entre 2000 e 2010?,ABATE_ABPEAV
+    2,Qual foi a inflação em 2015?,
+
+Cada série distinta é carregada uma única vez; as chamadas ao LLM rodam com até
+`--concurrency` em paralelo e no máximo `--rate` por minuto. Cada resposta é
+gravada no JSONL de saída assim que fica pronta; ao rodar de novo com o mesmo
+arquivo de saída, as perguntas já respondidas são puladas (as que falharam são
+refeitas).
+
+Uso (a partir de backend/):
+
+    python -m tools.batch_report perguntas.csv --output respostas.jsonl --concurrency 4 --rate 60
+"""
+import argparse
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+from tqdm import tqdm
+
+FIND_CHUNK = 64
+
+
+class RateLimiter:
+    """Espaça as chamadas para no máximo `per_minute` por minuto (0 = sem limite)."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def read_questions(path: str) -> List[Dict[str, str]]:
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    questions = []
+    for n, row in enumerate(rows, start=1):
+        questions.append({
+            "id": str(row.get("id") or n),
+            "question": row["question"],
+            "sercodigo": (row.get("sercodigo") or "").strip(),
+        })
+    return questions
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids já respondidos com sucesso em uma execução anterior."""
+    done = set()
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma interrupção
+                    continue
+                if "error" not in result:
+                    done.add(str(result["id"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def drop_partial_line(output_path: str) -> None:
+    """Corta a última linha truncada, para que a próxima resposta não seja gravada colada nela."""
+    try:
+        with open(output_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+
+def run_report(input_path: str, output_path: str, concurrency: int = 4, rate_per_minute: float = 0,
+               top_k: int = 3, compare: bool = False) -> None:
+    # Importado aqui: carrega o modelo de embeddings e as conexões do backend
+    from main import answer_with_context, build_query_context, load_series_for_query, store
+
+    questions = read_questions(input_path)
+    done = completed_ids(output_path)
+    pending = [q for q in questions if q["id"] not in done]
+    print(f"✅ {len(questions)} perguntas; {len(done)} já respondidas; {len(pending)} a processar.")
+    if not pending:
+        return
+
+    # 1. Resolver as séries das perguntas sem sercodigo (encode em lote + pipeline)
+    related: Dict[str, str] = {}
+    unresolved = [q for q in pending if not q["sercodigo"]]
+    for offset in tqdm(range(0, len(unresolved), FIND_CHUNK), desc="Resolvendo séries", disable=not unresolved):
+        chunk = unresolved[offset:offset + FIND_CHUNK]
+        found_series = store.knn_search_for_series_batch([q["question"] for q in chunk], k=top_k, endpoint="batch_report")
+        for q, found in zip(chunk, found_series):
+            if found:
+                q["sercodigo"] = found[0]["sercodigo"]
+                related[q["id"]] = ",".join(s["sercodigo"] for s in found)
+
+    # 2. Carregar cada série distinta uma única vez
+    names: Dict[str, str] = {}
+    failures: Dict[str, str] = {}
+    for sercodigo in tqdm(sorted({q["sercodigo"] for q in pending if q["sercodigo"]}), desc="Carregando séries"):
+        try:
+            names[sercodigo] = load_series_for_query(sercodigo, "batch_report")
+        except Exception as e:
+            failures[sercodigo] = str(e)
+
+    limiter = RateLimiter(rate_per_minute)
+
+    def answer(q: Dict[str, str]) -> dict:
+        result = {"id": q["id"], "question": q["question"], "sercodigo": q["sercodigo"]}
+        if not q["sercodigo"]:
+            return {**result, "error": "Nenhuma série encontrada para a pergunta."}
+        if q["sercodigo"] in failures:
+            return {**result, "error": failures[q["sercodigo"]]}
+        start = time.perf_counter()
+        try:
+            context = build_query_context(
+                q["question"], q["sercodigo"], names[q["sercodigo"]],
+                related.get(q["id"]) if compare else None, "batch_report",
+            )
+            limiter.wait()
+            llm_text = answer_with_context(context, endpoint="batch_report")
+        except Exception as e:
+            return {**result, "error": str(e)}
+        return {
+            **result,
+            "nome": names[q["sercodigo"]],
+            "llm_text": llm_text,
+            "context_used": context,
+            "seconds": round(time.perf_counter() - start, 2),
+        }
+
+    # 3. Perguntas em paralelo; cada resultado é gravado (e salvo em disco) ao ficar pronto
+    errors = 0
+    drop_partial_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(answer, q) for q in pending]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Respondendo"):
+            result = future.result()
+            errors += "error" in result
+            out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+
+    print(f"\n✅ Relatório gravado em {output_path}: {len(pending) - errors} respostas, {errors} erros.")
+    if errors:
+        print("Rode o mesmo comando novamente para refazer apenas as perguntas com erro.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Responde um arquivo de perguntas sobre séries do IPEA.")
+    parser.add_argument("input", help="CSV ou JSONL com question (e opcionalmente id, sercodigo)")
+    parser.add_argument("--output", required=True, help="JSONL de saída; reaproveitado para retomar")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chamadas simultâneas ao LLM")
+    parser.add_argument("--rate", type=float, default=0, help="Máximo de chamadas ao LLM por minuto (0 = sem limite)")
+    parser.add_argument("--top-k", type=int, default=3, help="Séries candidatas na resolução automática")
+    parser.add_argument("--compare", action="store_true",
+                        help="Inclui a comparação com as demais candidatas (requer o armazém DuckDB)")
+    args = parser.parse_args()
+    run_report(args.input, args.output, args.concurrency, args.rate, args.top_k, args.compare)
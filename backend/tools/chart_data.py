@@ -0,0 +1,28 @@
+# backend/tools/chart_data.py
+import numpy as np
+import orjson
+import pandas as pd
+
+from tools.downsampling import lttb
+
+
+def series_chart_payload(sercodigo: str, series: pd.Series, points: int) -> bytes:
+    """
+    Serializa a série em arrays colunares ({"date": [...], "value": [...]}) para o
+    gráfico da UI, reduzida com LTTB para no máximo `points` pontos.
+    """
+    total = len(series)
+    if total > points:
+        idx = lttb(series.index.asi8.astype(np.float64), series.to_numpy(dtype=np.float64), points)
+        series = series.iloc[idx]
+
+    return orjson.dumps(
+        {
+            "sercodigo": sercodigo,
+            "date": series.index.strftime('%Y-%m-%d').tolist(),
+            "value": series.to_numpy(dtype=np.float64),
+            "total_points": total,
+            "returned_points": len(series),
+        },
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
@@ -0,0 +1,108 @@
+# backend/tools/datasource.py
+"""
+Camada fina sobre as chamadas ao `ipeadatapy`, com três modos (IPEA_DATASOURCE_MODE):
+
+- live:   chama o IPEA pela rede (padrão);
+- record: chama o IPEA e grava cada resposta como fixture compacta em disco;
+- replay: responde apenas a partir das fixtures, sem rede.
+
+Formato das fixtures em IPEA_FIXTURES_DIR (DataFrames em pickle gzip):
+
+    metadata.pkl.gz            -> metadata()
+    list_series.pkl.gz         -> list_series()
+    metadata/<CODIGO>.pkl.gz   -> metadata(<CODIGO>)
+    series/<CODIGO>.pkl.gz     -> timeseries(<CODIGO>)
+"""
+import os
+import re
+from pathlib import Path
+from typing import Callable, Optional
+
+import ipeadatapy as ip
+import pandas as pd
+
+IPEA_DATASOURCE_MODE = os.environ.get("IPEA_DATASOURCE_MODE", "live")
+IPEA_FIXTURES_DIR = os.environ.get("IPEA_FIXTURES_DIR", "fixtures/ipea")
+MODES = ("live", "record", "replay")
+# Códigos viram nomes de arquivo das fixtures: nada de "/" ou outros caracteres de caminho
+SERCODIGO_RE = re.compile(r"[A-Za-z0-9_.]+")
+
+
+def _series_fixture(kind: str, sercodigo: str) -> str:
+    if not isinstance(sercodigo, str) or not SERCODIGO_RE.fullmatch(sercodigo):
+        raise ValueError(f"Código de série inválido: {sercodigo!r}.")
+    return f"{kind}/{sercodigo}"
+
+
+class IpeaDataSource:
+    """Fonte de dados do IPEA com gravação e reprodução de respostas."""
+
+    def __init__(self, mode: str = IPEA_DATASOURCE_MODE, fixtures_dir: str = IPEA_FIXTURES_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Modo inválido '{mode}'. Use um de {MODES}.")
+        self.mode = mode
+        self.fixtures_dir = Path(fixtures_dir)
+
+    def fixture_path(self, name: str) -> Path:
+        return self.fixtures_dir / f"{name}.pkl.gz"
+
+    def write_fixture(self, name: str, df: pd.DataFrame) -> None:
+        path = self.fixture_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_pickle(path, compression="gzip")
+
+    def read_fixture(self, name: str) -> Optional[pd.DataFrame]:
+        path = self.fixture_path(name)
+        if not path.exists():
+            return None
+        return pd.read_pickle(path)
+
+    def _call(self, name: str, fetch: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        if self.mode == "replay":
+            df = self.read_fixture(name)
+            if df is None:
+                raise ValueError(f"Fixture ausente para '{name}' em {self.fixtures_dir} (modo replay).")
+            return df
+        df = fetch()
+        if self.mode == "record":
+            self.write_fixture(name, df)
+        return df
+
+    def timeseries(self, sercodigo: str) -> pd.DataFrame:
+        return self._call(_series_fixture("series", sercodigo), lambda: ip.timeseries(sercodigo))
+
+    def metadata(self, sercodigo: Optional[str] = None) -> pd.DataFrame:
+        if sercodigo is None:
+            return self._call("metadata", ip.metadata)
+        name = _series_fixture("metadata", sercodigo)
+        if self.mode == "replay" and self.read_fixture(name) is None:
+            # Sem fixture específica, filtra o catálogo completo gravado
+            catalog = self._call("metadata", ip.metadata)
+            return catalog[catalog["CODE"] == sercodigo].reset_index(drop=True)
+        return self._call(name, lambda: ip.metadata(sercodigo))
+
+    def list_series(self) -> pd.DataFrame:
+        if self.mode == "replay" and self.read_fixture("list_series") is None:
+            return self._call("metadata", ip.metadata)[["CODE", "NAME"]]
+        return self._call("list_series", ip.list_series)
+
+
+def parse_timeseries(df: pd.DataFrame) -> pd.Series:
+    """
+    Valores numéricos de uma resposta de `timeseries()`, indexados por data e
+    ordenados; linhas sem data ou sem valor válidos são descartadas. Usada pelo
+    RedisTimeSeries e pelo armazém, para que a mesma série tenha as mesmas datas.
+    """
+    if {"YEAR", "MONTH", "DAY"} <= set(df.columns):
+        # Constrói o índice de data a partir das colunas
+        index = pd.to_datetime(df[["YEAR", "MONTH", "DAY"]], errors="coerce")
+    else:
+        # Assume o "Formato A" e apenas garante que o índice é datetime
+        index = pd.to_datetime(df.index, errors="coerce")
+    # A última coluna contém os valores
+    series = pd.to_numeric(df.iloc[:, -1], errors="coerce").set_axis(index)
+    return series[series.index.notna()].dropna().sort_index()
+
+
+# Instância padrão, configurada pelo ambiente, usada por todo o backend
+ipea = IpeaDataSource()
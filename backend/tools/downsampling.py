@@ -0,0 +1,49 @@
+# backend/tools/downsampling.py
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: escolhe `n_out` pontos que preservam a forma
+    visual da série (picos, vales e mudanças de inclinação).
+
+    Args:
+        x (np.ndarray): Eixo x crescente (ex.: timestamps em segundos).
+        y (np.ndarray): Valores, sem NaN.
+        n_out (int): Número de pontos desejado.
+
+    Returns:
+        np.ndarray: Índices (ordenados) dos pontos selecionados.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.linspace(0, n - 1, max(n_out, 0)).astype(np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # O primeiro e o último ponto são sempre mantidos; o miolo é dividido em n_out - 2 baldes
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Área do triângulo entre o ponto anterior, cada candidato e a média do próximo balde
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
@@ -0,0 +1,172 @@
+# backend/tools/eval_retrieval.py
+"""
+Avaliação da busca de séries (/find_series) em diferentes configurações de índice.
+
+Recebe um conjunto rotulado de perguntas -> SERCODIGO esperado e, para cada
+configuração ALGORITMO:TIPO:GRANULARIDADE (ex.: FLAT:FLOAT32:observation,
+HNSW:FLOAT16:series), cria um índice temporário, carrega as séries e mede
+recall@k, MRR e os percentis de latência da consulta ao índice.
+
+Formato do conjunto rotulado (CSV com cabeçalho ou JSONL), colunas `question` e
+`sercodigo`; vários códigos aceitos podem ser separados por "|":
+
+    question,sercodigo
+    Qual foi o abate de frangos em 2010?,ABATE_ABPEAV
+
+Uso (a partir de backend/):
+
+    python -m tools.eval_retrieval --labels eval.csv \\
+        --configs FLAT:FLOAT32:observation HNSW:FLOAT32:observation HNSW:FLOAT16:series
+"""
+import argparse
+import csv
+import json
+import time
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from redis.exceptions import ResponseError
+from tabulate import tabulate
+
+from rag.embedding import RedisVectorStore
+from rag.retrieval_metrics import summarize_run
+from tools.datasource import ipea
+from tools.index_data import build_series_doc, build_series_docs, series_metadata
+
+GRANULARITIES = ("observation", "series")
+EVAL_PREFIX = "eval:ipea"
+
+
+def load_labels(path: str) -> List[Tuple[str, Set[str]]]:
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    return [(row["question"], {c.strip() for c in str(row["sercodigo"]).split("|") if c.strip()}) for row in rows]
+
+
+def parse_config(spec: str) -> Dict[str, str]:
+    algorithm, dtype, granularity = spec.upper().split(":")
+    granularity = granularity.lower()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidade inválida '{granularity}'. Use uma de {GRANULARITIES}.")
+    return {"name": spec, "algorithm": algorithm, "dtype": dtype, "granularity": granularity}
+
+
+def build_documents(codes: List[str], granularity: str) -> List[Dict]:
+    """Monta os documentos com os mesmos textos usados pelos indexadores (tools/index_data.py)."""
+    meta_df = ipea.metadata()
+    docs = []
+    for code in codes:
+        meta_data = series_metadata(meta_df, code)
+        if meta_data is None:
+            print(f"⚠️ Série {code} não está no catálogo; ignorada.")
+            continue
+        if granularity == "series":
+            docs.append(build_series_doc(meta_data))
+            continue
+        try:
+            df = ipea.timeseries(code)
+        except Exception as e:
+            print(f"Erro na série {code}: {e}")
+            continue
+        docs.extend(build_series_docs(meta_data, df))
+    return docs
+
+
+def evaluate_config(config: Dict[str, str], docs: List[Dict], vectors: np.ndarray,
+                    labels: List[Tuple[str, Set[str]]], q_vectors: np.ndarray,
+                    max_k: int, ks: List[int], keep: bool = False) -> Dict:
+    tag = config["name"].lower().replace(":", "-")
+    store = RedisVectorStore(
+        index_name=f"idx:{EVAL_PREFIX}:{tag}",
+        prefix=f"{EVAL_PREFIX}:{tag}:",
+        algorithm=config["algorithm"],
+        dtype=config["dtype"],
+    )
+    try:
+        load_start = time.perf_counter()
+        pipe = store.r.pipeline(transaction=False)
+        for n, (doc, vec) in enumerate(zip(docs, vectors), start=1):
+            pipe.hset(store.key(doc["id"]), mapping=store.doc_mapping(doc["text"], doc["meta"], vec))
+            if n % 1000 == 0:
+                pipe.execute()
+        pipe.execute()
+        store.wait_indexed()
+        load_seconds = time.perf_counter() - load_start
+
+        rankings, latencies = [], []
+        for q_vec in q_vectors:
+            start = time.perf_counter()
+            results = store.search_series_by_vector(q_vec, k=max_k, endpoint="eval_retrieval")
+            latencies.append(time.perf_counter() - start)
+            rankings.append([r["sercodigo"] for r in results])
+
+        info = store.r.ft(store.index_name).info()
+        row = {"config": config["name"], "docs": len(docs)}
+        row.update(summarize_run(rankings, [expected for _, expected in labels], latencies, ks))
+        row["index_mb"] = round(float(info.get("vector_index_sz_mb", 0)), 2)
+        row["load_s"] = round(load_seconds, 2)
+        return row
+    finally:
+        if not keep:
+            try:
+                store.r.ft(store.index_name).dropindex(delete_documents=True)
+            except ResponseError:
+                pass
+
+
+def run_evaluation(labels_path: str, config_specs: List[str], codes: List[str] = None,
+                   distractors: int = 0, ks: List[int] = (1, 5, 10), keep: bool = False) -> List[Dict]:
+    labels = load_labels(labels_path)
+    configs = [parse_config(spec) for spec in config_specs]
+
+    # Séries carregadas: as esperadas no gabarito, as pedidas e N distratoras do catálogo
+    wanted = set(codes or [])
+    for _, expected in labels:
+        wanted.update(expected)
+    if distractors:
+        catalog = ipea.metadata()["CODE"].dropna().unique().tolist()
+        wanted.update([c for c in catalog if c not in wanted][:distractors])
+    all_codes = sorted(wanted)
+    print(f"✅ {len(labels)} perguntas rotuladas, {len(all_codes)} séries carregadas.")
+
+    # Os embeddings dependem só da granularidade: calculados uma vez e reaproveitados
+    encoder = RedisVectorStore(index_name=f"idx:{EVAL_PREFIX}:encoder", prefix=f"{EVAL_PREFIX}:encoder:")
+    q_vectors = encoder.embed_batch([question for question, _ in labels])
+    corpus = {}
+    for granularity in {c["granularity"] for c in configs}:
+        docs = build_documents(all_codes, granularity)
+        print(f"Gerando embeddings de {len(docs)} documentos ({granularity})...")
+        corpus[granularity] = (docs, encoder.embed_batch([d["text"] for d in docs]))
+    encoder.r.ft(encoder.index_name).dropindex(delete_documents=True)
+
+    max_k = max(ks)
+    table = []
+    for config in configs:
+        print(f"Avaliando {config['name']}...")
+        docs, vectors = corpus[config["granularity"]]
+        table.append(evaluate_config(config, docs, vectors, labels, q_vectors, max_k, list(ks), keep))
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avalia recall@k, MRR e latência da busca de séries.")
+    parser.add_argument("--labels", required=True, help="CSV ou JSONL com question,sercodigo")
+    parser.add_argument("--configs", nargs="+", default=["FLAT:FLOAT32:observation"],
+                        help="Configurações ALGORITMO:TIPO:GRANULARIDADE")
+    parser.add_argument("--codes", nargs="*", help="Séries extras a carregar além das do gabarito")
+    parser.add_argument("--distractors", type=int, default=0, help="N séries do catálogo como distratoras")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10], help="Valores de k para o recall")
+    parser.add_argument("--keep", action="store_true", help="Mantém os índices de avaliação no Redis")
+    parser.add_argument("--output", help="Grava a tabela também em JSON")
+    args = parser.parse_args()
+
+    rows = run_evaluation(args.labels, args.configs, args.codes, args.distractors, args.k, args.keep)
+    print(tabulate(rows, headers="keys", tablefmt="github"))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultado gravado em {args.output}")
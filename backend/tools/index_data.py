@@ -1,84 +1,242 @@
-import ipeadatapy as ip
-from rag.embedding import RedisVectorStore
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+from typing import Any, Dict, List, Optional
+
 import pandas as pd
+from tqdm import tqdm
 
-def index_all_series():
-    store = RedisVectorStore()
+from rag.embedding import RedisVectorStore
+from rag.index_keys import observation_doc_id, series_doc_id
+from tools.datasource import ipea
+from tools.metrics import record_indexed_series, start_indexer_metrics_server
+from tools.timeseries_store import SeriesTimeSeriesStore
 
-    print("Obtendo lista de todas as séries do IPEA...")
-    meta_df = ip.metadata()  # DataFrame com CODE, NAME, UNIT, COMMENT, etc.
-    all_codes = meta_df["CODE"].dropna().unique().tolist()
-    print(f"✅ {len(all_codes)} códigos encontrados.")
+# Processos de embedding e threads do torch em cada um (ver index_all_series)
+INDEX_WORKERS = int(os.environ.get("INDEX_WORKERS", "1"))
+INDEX_THREADS_PER_WORKER = int(os.environ.get("INDEX_THREADS_PER_WORKER", "0"))
+# "normalized": um documento com vetor por série e observações enxutas (data, valor
+# e sercodigo); "observation": layout antigo, com nome/descrição em cada observação
+INDEX_LAYOUT = os.environ.get("INDEX_LAYOUT", "normalized")
+LAYOUTS = ("normalized", "observation")
 
-    total_series = 0
-    total_records = 0
 
-    # Adicionando um contador de progresso
-    from tqdm import tqdm
+def series_metadata(meta_df: pd.DataFrame, ser_code: str) -> Optional[Dict[str, Any]]:
+    # OTIMIZAÇÃO 1: Buscar metadados apenas uma vez por série
+    meta_row = meta_df[meta_df["CODE"] == ser_code]
+    if meta_row.empty:
+        return None
+    return {
+        "sercodigo": ser_code,
+        "nome": meta_row["NAME"].values[0],
+        "unidade": meta_row["UNIT"].values[0],
+        "descricao": meta_row["COMMENT"].values[0]
+    }
 
-    for ser_code in tqdm(all_codes, desc="Indexando séries"):
-        # OTIMIZAÇÃO 1: Buscar metadados apenas uma vez por série
-        meta_row = meta_df[meta_df["CODE"] == ser_code]
-        if meta_row.empty:
-            continue
-        
-        meta_data = {
+
+def series_text(meta_data: Dict[str, Any]) -> str:
+    return (
+        f"Série {meta_data['nome']} ({meta_data['sercodigo']}). "
+        f"Descrição: {meta_data['descricao']}. "
+        f"Unidade: {meta_data['unidade']}"
+    )
+
+
+def build_series_doc(meta_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento da série (layout normalizado): os campos da série, gravados e embedados uma única vez."""
+    return {
+        "id": series_doc_id(meta_data["sercodigo"]),
+        "text": series_text(meta_data),
+        "meta": {key: meta_data[key] for key in ("sercodigo", "nome", "unidade", "descricao")},
+    }
+
+
+def build_observation_records(ser_code: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Observações do layout normalizado: só data, valor e a referência à série, sem texto nem vetor."""
+    return [
+        {
+            "id": observation_doc_id(ser_code, row.name),
+            "meta": {"sercodigo": ser_code, "date": row.name.strftime('%Y-%m-%d'), "value": row.iloc[-1]},
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def build_series_docs(meta_data: Dict[str, Any], df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Documentos do layout "observation": um por observação, cada um com o texto completo da série."""
+    # OTIMIZAÇÃO 2: Preparar todos os documentos antes de indexar
+    ser_code = meta_data["sercodigo"]
+    docs_to_add = []
+    for _, row in df.iterrows():
+        # Inclusão de Nome e Descrição no campo `text` para melhor RAG
+        text = (
+            f"Série {meta_data['nome']} ({ser_code}). "
+            f"Descrição: {meta_data['descricao']}. "
+            f"Data: {row.name.strftime('%Y-%m-%d')} - Valor: {row.iloc[-1]} ({meta_data['unidade']})"
+        )
+
+        # Assegurar que os metadados sejam strings para o Redis
+        meta_for_redis = {
             "sercodigo": ser_code,
-            "nome": meta_row["NAME"].values[0],
-            "unidade": meta_row["UNIT"].values[0],
-            "descricao": meta_row["COMMENT"].values[0]
+            "date": str(row.name.strftime('%Y-%m-%d')),
+            "value": row.iloc[-1],
+            "nome": meta_data['nome'],
+            "unidade": meta_data['unidade']
         }
-        
-        print(f"Baixando série {ser_code}...")
-        try:
-            df = ip.timeseries(ser_code)
-        except Exception as e:
-            print(f"Erro na série {ser_code}: {e}")
-            continue
 
+        # Prepara o documento para a indexação
+        docs_to_add.append({
+            "id": observation_doc_id(ser_code, row.name),
+            "text": text,
+            "meta": meta_for_redis
+        })
+    return docs_to_add
+
+
+def index_series(store: RedisVectorStore, ts_store: SeriesTimeSeriesStore,
+                 meta_df: pd.DataFrame, ser_code: str, layout: str = INDEX_LAYOUT) -> Optional[Dict[str, Any]]:
+    """
+    Baixa, grava no RedisTimeSeries e indexa uma série. Retorna um resumo
+    ({"docs", "records", "seconds"}) ou None se a série foi pulada; um erro em
+    uma série é registrado e não interrompe a indexação das demais.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout inválido '{layout}'. Use um de {LAYOUTS}.")
+    meta_data = series_metadata(meta_df, ser_code)
+    if meta_data is None:
+        return None
+
+    print(f"Baixando série {ser_code}...")
+    try:
+        df = ipea.timeseries(ser_code)
         if df.empty:
+            return None
+
+        # Observações numéricas vão também para o RedisTimeSeries, usado pelo /query
+        ts_store.write_series(ser_code, pd.to_numeric(df.iloc[:, -1], errors="coerce"))
+
+        series_start = time.perf_counter()
+        if layout == "normalized":
+            # Um único embedding por série; as observações não têm vetor
+            docs = store.add_docs([build_series_doc(meta_data)])
+            docs += store.add_records(build_observation_records(ser_code, df))
+        else:
+            # OTIMIZAÇÃO 3: embeddings em lote e HSETs em pipeline
+            docs = store.add_docs(build_series_docs(meta_data, df))
+    except Exception as e:
+        print(f"Erro na série {ser_code}: {e}")
+        return None
+    return {"docs": docs, "records": len(df), "seconds": time.perf_counter() - series_start}
+
+
+def _embedding_worker(codes: mp.Queue, results: mp.Queue, meta_df: pd.DataFrame, threads: int, layout: str,
+                      index_name: Optional[str], prefix: Optional[str]) -> None:
+    """
+    Processo de indexação: cada um carrega seu próprio modelo e conexão Redis e
+    consome códigos da fila compartilhada até receber None.
+    """
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    store = RedisVectorStore(index_name=index_name, prefix=prefix)
+    ts_store = SeriesTimeSeriesStore(store.r)
+    while True:
+        ser_code = codes.get()
+        if ser_code is None:
+            break
+        results.put((ser_code, index_series(store, ts_store, meta_df, ser_code, layout)))
+
+
+def _index_parallel(meta_df: pd.DataFrame, all_codes: List[str], workers: int, threads: int, layout: str,
+                    index_name: Optional[str], prefix: Optional[str]):
+    # "spawn": o torch não se comporta bem em processos criados com fork
+    ctx = mp.get_context("spawn")
+    codes, results = ctx.Queue(), ctx.Queue()
+    for ser_code in all_codes:
+        codes.put(ser_code)
+    for _ in range(workers):
+        codes.put(None)
+
+    procs = [
+        ctx.Process(target=_embedding_worker, args=(codes, results, meta_df, threads, layout, index_name, prefix), daemon=True)
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    pending = len(all_codes)
+    while pending:
+        try:
+            yield results.get(timeout=5)
+            pending -= 1
+        except queue.Empty:
+            if not any(proc.is_alive() for proc in procs):
+                print(f"❌ Todos os processos de indexação terminaram com {pending} séries pendentes.")
+                break
+    for proc in procs:
+        proc.join()
+
+
+def index_all_series(workers: int = INDEX_WORKERS, threads_per_worker: int = INDEX_THREADS_PER_WORKER,
+                     layout: str = INDEX_LAYOUT, start: int = 0,
+                     index_name: Optional[str] = None, prefix: Optional[str] = None):
+    """
+    Indexa todas as séries do catálogo.
+
+    Com `workers` > 1, o embedding roda em N processos (cada um com
+    `threads_per_worker` threads do torch; 0 mantém o padrão do torch) que
+    consomem uma fila compartilhada de séries. Para usar todos os núcleos sem
+    disputa, mantenha workers * threads_per_worker <= número de núcleos.
+
+    `start` pula os primeiros códigos do catálogo, para retomar uma indexação
+    interrompida. Sem `index_name`, grava no índice vivo (o do alias); com ele,
+    em um índice à parte, como na reindexação de tools/reindex.py.
+    """
+    start_indexer_metrics_server()
+
+    print("Obtendo lista de todas as séries do IPEA...")
+    meta_df = ipea.metadata()  # DataFrame com CODE, NAME, UNIT, COMMENT, etc.
+    all_codes = meta_df["CODE"].dropna().unique().tolist()[start:]
+    print(f"✅ {len(all_codes)} códigos encontrados (layout {layout}).")
+
+    if workers > 1:
+        print(f"Indexando com {workers} processos ({threads_per_worker or 'padrão'} threads cada)...")
+        results = _index_parallel(meta_df, all_codes, workers, threads_per_worker, layout, index_name, prefix)
+    else:
+        store = RedisVectorStore(index_name=index_name, prefix=prefix)
+        ts_store = SeriesTimeSeriesStore(store.r)
+        results = ((ser_code, index_series(store, ts_store, meta_df, ser_code, layout)) for ser_code in all_codes)
+
+    total_series = 0
+    total_records = 0
+    total_docs = 0
+    indexing_start = time.perf_counter()
+    for position, (ser_code, summary) in enumerate(tqdm(results, total=len(all_codes), desc="Indexando séries"), start=1):
+        if summary is None:
             continue
-            
         total_series += 1
-        total_records += len(df)
-        
-        # OTIMIZAÇÃO 2: Preparar todos os documentos antes de indexar
-        docs_to_add = []
-        for i, row in df.iterrows():
-            # Inclusão de Nome e Descrição no campo `text` para melhor RAG
-            text = (
-                f"Série {meta_data['nome']} ({ser_code}). "
-                f"Descrição: {meta_data['descricao']}. "
-                f"Data: {row.name.strftime('%Y-%m-%d')} - Valor: {row.iloc[-1]} ({meta_data['unidade']})"
-            )
-            
-            # Assegurar que os metadados sejam strings para o Redis
-            meta_for_redis = {
-                "sercodigo": meta_data['sercodigo'],
-                "date": str(row.name.strftime('%Y-%m-%d')),
-                "value": row.iloc[-1],
-                "nome": meta_data['nome'],
-                "unidade": meta_data['unidade']
-            }
-            
-            # Prepara o documento para a indexação
-            docs_to_add.append({
-                "id": f"{ser_code}:{i}",
-                "text": text,
-                "meta": meta_for_redis
-            })
-
-        # OTIMIZAÇÃO 3: Usar o método `add_docs` se disponível, ou iterar de forma mais eficiente
-        if hasattr(store, 'add_docs'):
-            store.add_docs(docs_to_add)
-        else:
-            # Alternativa mais rápida: usar hset multi-chave diretamente
-            # Esta lógica pode precisar de ajuste dependendo de como a sua classe RedisVectorStore
-            # foi implementada para lidar com múltiplos documentos
-            for doc in docs_to_add:
-                 store.add_doc(doc['id'], doc['text'], doc['meta'])
+        total_records += summary["records"]
+        total_docs += summary["docs"]
+        record_indexed_series(
+            summary["docs"], total_docs, time.perf_counter() - indexing_start, len(all_codes) - position
+        )
 
     print(f"\n✅ Indexação completa: {total_series} séries, {total_records} registros.")
 
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Indexa as séries do IPEA no Redis.")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS, help="Processos de embedding")
+    parser.add_argument("--threads-per-worker", type=int, default=INDEX_THREADS_PER_WORKER,
+                        help="Threads do torch por processo (0 = padrão do torch)")
+    parser.add_argument("--layout", choices=LAYOUTS, default=INDEX_LAYOUT,
+                        help="normalized (um vetor por série) ou observation (layout antigo)")
+    parser.add_argument("--start", type=int, default=0, help="Pula os N primeiros códigos do catálogo")
+    args = parser.parse_args()
+    index_all_series(args.workers, args.threads_per_worker, args.layout, args.start)
+
+
 if __name__ == "__main__":
-    index_all_series()
+    main()
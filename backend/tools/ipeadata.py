@@ -3,15 +3,43 @@ import requests
 import os
 import re
 import time
-import redis
 import pandas as pd
-import ipeadatapy as ip
 import json  # CORREÇÃO: Adicionada importação do módulo json
 from typing import Optional, Dict, Any, List, Tuple
 from urllib.parse import quote_plus
 
+from tools.metrics import record_cache
+from tools.datasource import ipea, parse_timeseries
+from tools.metadata_index import read_metadata, search_metadata, write_metadata_rows
+from tools.redis_pool import get_redis
+
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:8999")
-r = redis.Redis.from_url(REDIS_URL)
+SERIES_CACHE_TTL = int(os.environ.get("SERIES_CACHE_TTL", "600"))
+r = get_redis(REDIS_URL)
+
+# Cache curto em memória: /query e /series/{codigo}/data são chamados em paralelo
+# pela UI para a mesma série e não devem baixá-la duas vezes do IPEA.
+_series_cache: Dict[str, Tuple[float, pd.Series]] = {}
+
+
+def load_series(sercodigo: str) -> pd.Series:
+    """
+    Baixa uma série do IPEA e devolve seus valores numéricos indexados por data.
+
+    Lança ValueError se a série não tiver observações válidas.
+    """
+    cached = _series_cache.get(sercodigo)
+    hit = bool(cached) and time.monotonic() - cached[0] < SERIES_CACHE_TTL
+    record_cache("series_memory", hit)
+    if hit:
+        return cached[1]
+
+    series = parse_timeseries(ipea.timeseries(sercodigo))
+    if series.empty:
+        raise ValueError(f"A série {sercodigo} não retornou dados válidos do IPEA.")
+
+    _series_cache[sercodigo] = (time.monotonic(), series)
+    return series
 
 def get_series_values(
     sercodigo: str, 
@@ -24,7 +52,7 @@ def get_series_values(
      Retorna um DataFrame pronto para análise.
     """
     try:
-        df = ip.timeseries(sercodigo)
+        df = ipea.timeseries(sercodigo)
     except Exception as e:
         # Se a série não for encontrada, retorna um DataFrame vazio
         print(f"Aviso: Falha ao buscar a série {sercodigo}. Erro: {e}")
@@ -46,25 +74,12 @@ def get_series_values(
 
 def search_metadata_by_keyword(q: str, top: int = 20) -> List[Dict[str, Any]]:
     """
-    Search Metadados by keyword in Portuguese (naive).
-    Uses OData filter $filter=contains(Descricao,'q') or Title etc.
-    Naive search over Metadados using OData contains on
-    Nome/Descricao/SERCODIGO.
+    Busca por palavra-chave nos metadados (nome, descrição, unidade e código),
+    sem diferenciar acentos, com uma única consulta ao índice `idx:ipea:meta`.
     """
     if not q:
         return []
-
-    results = []
-    q_lower = q.lower()  # CORREÇÃO: Usar a variável `q`
-
-    # CORREÇÃO: Usar `scan_iter` para um método de busca mais seguro e performático
-    for key in r.scan_iter("meta:*"):
-        meta = json.loads(r.get(key))
-        if any(q_lower in str(v).lower() for v in meta.values()):
-            results.append(meta)
-            if len(results) >= top:
-                break
-    return results
+    return search_metadata(r, q, top)
 
 def knn_search_for_series_code(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
     """Busca apenas pelos códigos de série mais relevantes."""
@@ -98,16 +113,42 @@ def get_metadata_by_sercodigo(sercodigo: str) -> Optional[Dict[str, Any]]:
     """
     Get metadata for a specific SERCODIGO
     """
-    meta = r.get(f"meta:{sercodigo}")
+    meta = read_metadata(r, sercodigo)
+    record_cache("metadata_redis", bool(meta))
     if meta:
-        return json.loads(meta)
+        return meta
 
-    # Busca direta do IPEA caso não esteja no Redis
-    # CORREÇÃO: Usar a variável `ip` do import `ipeadatapy as ip`
-    metadata_df = ip.metadata()
+    # Falta no Redis: responde a partir do catálogo em memória, sem ir à rede
+    metadata_df = get_metadata_catalog()
     meta_row = metadata_df[metadata_df["CODE"] == sercodigo]
     if not meta_row.empty:
-        meta_json = meta_row.iloc[0].to_json()
-        r.set(f"meta:{sercodigo}", meta_json)
-        return json.loads(meta_json)
+        write_metadata_rows(r, meta_row)
+        return json.loads(meta_row.iloc[0].to_json())
     return None
+
+
+# Catálogo completo do IPEA em memória: baixado uma vez por processo (ou pelo
+# prewarm_metadata) e usado nas faltas do cache `meta:{codigo}`.
+_metadata_catalog: Optional[pd.DataFrame] = None
+
+
+def get_metadata_catalog() -> pd.DataFrame:
+    global _metadata_catalog
+    if _metadata_catalog is None:
+        _metadata_catalog = ipea.metadata()
+    return _metadata_catalog
+
+
+def prewarm_metadata() -> pd.DataFrame:
+    """
+    Baixa o catálogo uma vez, guarda-o em memória e grava todas as linhas como
+    hashes `meta:{codigo}` em uma passada com pipelines. Roda no aquecimento da
+    API e periodicamente (METADATA_REFRESH_SECONDS).
+    """
+    global _metadata_catalog
+    start = time.perf_counter()
+    metadata_df = ipea.metadata()
+    _metadata_catalog = metadata_df
+    written = write_metadata_rows(r, metadata_df)
+    print(f"✅ {written} metadados gravados no Redis em {time.perf_counter() - start:.1f}s.")
+    return metadata_df
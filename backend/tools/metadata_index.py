@@ -0,0 +1,107 @@
+# backend/tools/metadata_index.py
+"""
+Metadados das séries em hashes `meta:{CODIGO}`, com um índice RediSearch
+(`idx:ipea:meta`) em português para a busca por palavra-chave.
+
+Cada hash guarda as colunas principais do catálogo, a linha completa em JSON
+(campo `json`, o mesmo formato que antes ficava na string `meta:{CODIGO}`) e
+o campo `search_text`: nome, descrição, unidade e código em minúsculas e sem
+acentos, para que "producao" encontre "Produção".
+"""
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import redis
+from redis.commands.search.field import TagField, TextField
+from redis.commands.search.index_definition import IndexDefinition, IndexType
+from redis.commands.search.query import Query as RediSearchQuery
+from redis.exceptions import ResponseError
+
+META_PREFIX = os.environ.get("REDIS_META_PREFIX", "meta:")
+META_INDEX_NAME = os.environ.get("REDIS_META_INDEX_NAME", "idx:ipea:meta")
+META_WRITE_BATCH = 1000
+
+TEXT_COLUMNS = ("NAME", "COMMENT", "UNIT")
+
+# O índice é verificado uma vez por processo, na primeira escrita ou busca
+_index_checked = False
+
+
+def unaccent(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+def meta_key(sercodigo: str) -> str:
+    return f"{META_PREFIX}{sercodigo}"
+
+
+def ensure_metadata_index(r: redis.Redis) -> None:
+    global _index_checked
+    if _index_checked:
+        return
+    try:
+        r.ft(META_INDEX_NAME).info()
+    except ResponseError:
+        r.ft(META_INDEX_NAME).create_index(
+            fields=[
+                TagField("CODE"),
+                TextField("NAME", weight=3.0),
+                TextField("search_text"),
+            ],
+            definition=IndexDefinition(prefix=[META_PREFIX], index_type=IndexType.HASH, language="portuguese"),
+        )
+    _index_checked = True
+
+
+def metadata_mapping(row: pd.Series) -> Dict[str, str]:
+    texts = ["" if pd.isna(row.get(col)) else str(row.get(col)) for col in TEXT_COLUMNS]
+    return {
+        "CODE": str(row["CODE"]),
+        "NAME": texts[0],
+        "search_text": unaccent(" ".join(texts + [str(row["CODE"])])),
+        "json": row.to_json(),
+    }
+
+
+def write_metadata_rows(r: redis.Redis, meta_df: pd.DataFrame) -> int:
+    """Grava as linhas do catálogo como hashes, em pipelines de META_WRITE_BATCH."""
+    ensure_metadata_index(r)
+    pipe = r.pipeline(transaction=False)
+    written = 0
+    for _, row in meta_df.iterrows():
+        if pd.isna(row.get("CODE")):
+            continue
+        key = meta_key(row["CODE"])
+        # Remove versões antigas gravadas como string JSON
+        pipe.unlink(key)
+        pipe.hset(key, mapping=metadata_mapping(row))
+        written += 1
+        if written % META_WRITE_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+    return written
+
+
+def read_metadata(r: redis.Redis, sercodigo: str) -> Optional[Dict[str, Any]]:
+    try:
+        raw = r.hget(meta_key(sercodigo), "json")
+    except ResponseError:
+        # Chave no formato antigo (string); será regravada como hash
+        return None
+    return json.loads(raw) if raw else None
+
+
+def search_metadata(r: redis.Redis, q: str, top: int = 20) -> List[Dict[str, Any]]:
+    """Uma única consulta FT.SEARCH; todos os termos precisam aparecer (com stemming)."""
+    terms = re.findall(r"\w+", unaccent(q))
+    if not terms:
+        return []
+    ensure_metadata_index(r)
+    query = RediSearchQuery(f"@search_text:({' '.join(terms)})").return_fields("json").paging(0, top)
+    res = r.ft(META_INDEX_NAME).search(query)
+    return [json.loads(doc.json) for doc in res.docs]
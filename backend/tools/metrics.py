@@ -0,0 +1,128 @@
+# backend/tools/metrics.py
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+
+from tools.tracing import tracer
+
+INDEXER_METRICS_PORT = int(os.environ.get("INDEXER_METRICS_PORT", "0"))
+
+# Buckets cobrem desde buscas no Redis (ms) até chamadas ao LLM (dezenas de segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_LATENCY = Histogram(
+    "inspector_stage_seconds",
+    "Latência de cada etapa de um endpoint.",
+    ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "inspector_stage_errors_total",
+    "Erros por etapa de um endpoint.",
+    ["endpoint", "stage"],
+)
+CACHE_REQUESTS = Counter(
+    "inspector_cache_requests_total",
+    "Consultas a caches, por resultado (hit ou miss).",
+    ["cache", "result"],
+)
+LLM_TOKENS = Counter(
+    "inspector_llm_tokens_total",
+    "Tokens enviados ao LLM (prompt) e recebidos (completion).",
+    ["kind"],
+)
+INDEXED_DOCS = Counter(
+    "inspector_indexer_docs_total",
+    "Documentos gravados pelos indexadores.",
+)
+INDEXER_DOCS_PER_SECOND = Gauge(
+    "inspector_indexer_docs_per_second",
+    "Vazão agregada de indexação: documentos gravados por segundo de relógio desde o início.",
+)
+INDEXER_QUEUE_DEPTH = Gauge(
+    "inspector_indexer_queue_depth",
+    "Séries ainda aguardando indexação.",
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "inspector_redis_pool_connections",
+    "Conexões do pool Redis compartilhado, por estado (in_use, idle, max).",
+    ["pool", "state"],
+)
+EMBED_MICROBATCH_SIZE = Histogram(
+    "inspector_embed_microbatch_size",
+    "Textos por chamada ao modelo no micro-batching de embeddings.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+EVENT_LOOP_LAG = Histogram(
+    "inspector_event_loop_lag_seconds",
+    "Atraso do event loop em relação ao intervalo esperado do monitor.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+THREADPOOL_IN_USE = Gauge(
+    "inspector_threadpool_in_use",
+    "Threads do pool de endpoints síncronos ocupadas.",
+)
+THREADPOOL_SIZE = Gauge(
+    "inspector_threadpool_size",
+    "Tamanho do pool de threads dos endpoints síncronos.",
+)
+
+
+@contextmanager
+def stage_timer(endpoint: str, stage: str):
+    """
+    Mede a duração de uma etapa e conta as exceções que ela lançar. Cada etapa
+    também vira um span "<endpoint>.<etapa>" quando o tracing está ativo.
+
+    Uso:
+        with stage_timer("query", "llm"):
+            answer = generate_answer(prompt)
+    """
+    start = time.perf_counter()
+    with tracer.start_as_current_span(f"{endpoint}.{stage}"):
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(endpoint, stage).inc()
+            raise
+        finally:
+            STAGE_LATENCY.labels(endpoint, stage).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_indexed_series(docs: int, total_docs: int, elapsed: float, remaining: int) -> None:
+    """
+    Atualiza as métricas dos indexadores após gravar uma série. A vazão é
+    `total_docs` sobre o tempo de relógio `elapsed`, medidos no processo
+    principal, para somar todos os workers.
+    """
+    INDEXED_DOCS.inc(docs)
+    if elapsed > 0:
+        INDEXER_DOCS_PER_SECOND.set(total_docs / elapsed)
+    INDEXER_QUEUE_DEPTH.set(remaining)
+
+
+def start_indexer_metrics_server() -> None:
+    """
+    Os indexadores não rodam dentro da API; quando INDEXER_METRICS_PORT está
+    definido, eles expõem /metrics em um servidor HTTP próprio.
+    """
+    if INDEXER_METRICS_PORT:
+        start_http_server(INDEXER_METRICS_PORT)
+        print(f"📈 Métricas do indexador em http://0.0.0.0:{INDEXER_METRICS_PORT}/metrics")
+
+
+def render_latest():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,153 @@
+# backend/tools/migrate_layout.py
+"""
+Migra o índice vetorial do layout "observation" para o "normalized"
+(ver INDEX_LAYOUT em tools/index_data.py) sem baixar as séries de novo.
+
+No layout antigo cada observação `doc:ipea:{CODIGO}:{i}` guarda o texto completo
+(nome, descrição e unidade), esses campos e o vetor. A migração:
+
+1. cria o documento da série `doc:ipea:{CODIGO}` (um embedding por série), com
+   os metadados do catálogo ou, se a série saiu do catálogo, com os campos das
+   próprias observações;
+2. remove `text`, `nome`, `unidade` e `vector` das observações, que ficam só com
+   `sercodigo`, `date` e `value`.
+
+Os documentos de série são criados antes da limpeza, então a busca continua
+funcionando durante a migração. Rodar de novo é seguro: séries que já têm
+documento são puladas e o HDEL de campos inexistentes não faz nada.
+
+A memória do Redis (INFO memory, MEMORY USAGE das chaves e FT.INFO do índice) é
+medida antes e depois.
+
+Uso (a partir de backend/):
+
+    python -m tools.migrate_layout --dry-run
+    python -m tools.migrate_layout
+"""
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import redis
+from redis.exceptions import ResponseError
+from tabulate import tabulate
+from tqdm import tqdm
+
+from rag.embedding import LEGACY_FIELDS, RedisVectorStore
+from tools.datasource import ipea
+from tools.index_data import build_series_doc, series_metadata
+
+MIGRATE_BATCH = 1000
+MB = 1024 * 1024
+
+
+def _decode(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def memory_report(r: redis.Redis, prefix: str, index_name: str) -> Dict[str, float]:
+    """Memória total do Redis, das chaves do prefixo (MEMORY USAGE) e do índice."""
+    keys = [key for key in r.scan_iter(f"{prefix}*", count=MIGRATE_BATCH)]
+    keys_bytes = 0
+    for i in range(0, len(keys), MIGRATE_BATCH):
+        pipe = r.pipeline(transaction=False)
+        for key in keys[i:i + MIGRATE_BATCH]:
+            pipe.memory_usage(key, samples=0)
+        keys_bytes += sum(size or 0 for size in pipe.execute())
+
+    report = {
+        "used_memory_mb": r.info("memory")["used_memory"] / MB,
+        "keys": len(keys),
+        "keys_mb": keys_bytes / MB,
+    }
+    try:
+        info = r.ft(index_name).info()
+    except ResponseError:
+        return report
+    for field in ("num_docs", "vector_index_sz_mb", "inverted_sz_mb", "doc_table_size_mb"):
+        if field in info:
+            report[field] = float(info[field])
+    return report
+
+
+def scan_layout(r: redis.Redis, prefix: str) -> Tuple[Dict[str, List[bytes]], set]:
+    """Chaves de observação agrupadas por série e o conjunto de séries que já têm documento próprio."""
+    observations: Dict[str, List[bytes]] = defaultdict(list)
+    series_docs = set()
+    for key in r.scan_iter(f"{prefix}*", count=MIGRATE_BATCH):
+        code, _, rest = _decode(key)[len(prefix):].partition(":")
+        if rest:
+            observations[code].append(key)
+        else:
+            series_docs.add(code)
+    return observations, series_docs
+
+
+def fallback_metadata(r: redis.Redis, code: str, obs_key: bytes) -> Optional[Dict[str, str]]:
+    """Metadados de uma série fora do catálogo, lidos de uma das suas observações antigas."""
+    nome, unidade = r.hmget(obs_key, "nome", "unidade")
+    if nome is None:
+        return None
+    return {"sercodigo": code, "nome": _decode(nome), "unidade": _decode(unidade or ""), "descricao": ""}
+
+
+def migrate(store: RedisVectorStore, meta_df: pd.DataFrame, dry_run: bool = False) -> Dict[str, int]:
+    r = store.r
+    observations, series_docs = scan_layout(r, store.prefix)
+    missing = sorted(set(observations) - series_docs)
+    stats = {"series": len(observations), "series_docs_created": 0, "observations": 0, "skipped": 0}
+    print(f"✅ {len(observations)} séries com observações; {len(missing)} sem documento de série.")
+    if dry_run:
+        stats["observations"] = sum(len(keys) for keys in observations.values())
+        return stats
+
+    # 1. Documentos de série (com embedding), em lotes
+    skipped = set()
+    docs = []
+    for code in tqdm(missing, desc="Documentos de série"):
+        meta_data = series_metadata(meta_df, code) or fallback_metadata(r, code, observations[code][0])
+        if meta_data is None:
+            print(f"⚠️ Série {code} sem metadados; observações mantidas como estão.")
+            skipped.add(code)
+            continue
+        docs.append(build_series_doc(meta_data))
+        if len(docs) == MIGRATE_BATCH:
+            stats["series_docs_created"] += store.add_docs(docs)
+            docs = []
+    stats["series_docs_created"] += store.add_docs(docs)
+
+    stats["skipped"] = len(skipped)
+
+    # 2. Observações enxutas: só sercodigo, date e value
+    obs_keys = [key for code, keys in observations.items() if code not in skipped for key in keys]
+    stats["observations"] = len(obs_keys)
+    pipe = r.pipeline(transaction=False)
+    for n, key in enumerate(tqdm(obs_keys, desc="Observações"), start=1):
+        pipe.hdel(key, *LEGACY_FIELDS)
+        if n % MIGRATE_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+    return stats
+
+
+def print_comparison(before: Dict[str, float], after: Dict[str, float]) -> None:
+    rows = []
+    for field, value in before.items():
+        new = after.get(field, 0.0)
+        change = f"{(new - value) / value:+.1%}" if value else "-"
+        rows.append({"métrica": field, "antes": round(value, 2), "depois": round(new, 2), "variação": change})
+    print(tabulate(rows, headers="keys", tablefmt="github"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra o índice vetorial para o layout normalizado.")
+    parser.add_argument("--dry-run", action="store_true", help="Só mede a memória e conta o que seria migrado")
+    args = parser.parse_args()
+
+    store = RedisVectorStore()
+    before = memory_report(store.r, store.prefix, store.index_name)
+    stats = migrate(store, ipea.metadata(), dry_run=args.dry_run)
+    print(stats)
+    after = before if args.dry_run else memory_report(store.r, store.prefix, store.index_name)
+    print_comparison(before, after)
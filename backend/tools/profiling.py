@@ -0,0 +1,138 @@
+# backend/tools/profiling.py
+"""
+Diagnóstico de requisições lentas.
+
+1. Profiling sob demanda: quando PROFILING_ADMIN_TOKEN está definido, uma
+   requisição com o cabeçalho `X-Profile: <token>` (ou `?profile=<token>`) é
+   executada sob o cProfile. O relatório é gravado em PROFILE_DIR e seu id volta
+   no cabeçalho `X-Profile-Id`; o texto é lido em `/admin/profiles/{id}`.
+
+   Os endpoints síncronos rodam no pool de threads, fora do middleware, por isso
+   o profiler é ligado pelo decorador `@profiled` na própria thread do endpoint.
+   O middleware só marca a requisição em uma ContextVar, que o Starlette copia
+   para a thread.
+
+2. Monitor sempre ativo: mede o atraso do event loop e a ocupação do pool de
+   threads, registra no /metrics e avisa no log quando passam dos limites.
+"""
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from anyio import to_thread
+from fastapi import Request
+
+from tools.metrics import EVENT_LOOP_LAG, THREADPOOL_IN_USE, THREADPOOL_SIZE
+
+PROFILING_ADMIN_TOKEN = os.environ.get("PROFILING_ADMIN_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_TOP_FUNCTIONS = int(os.environ.get("PROFILE_TOP_FUNCTIONS", "40"))
+LOOP_MONITOR_INTERVAL = float(os.environ.get("LOOP_MONITOR_INTERVAL", "0.5"))
+LOOP_LAG_WARN_MS = float(os.environ.get("LOOP_LAG_WARN_MS", "100"))
+THREADPOOL_WARN_RATIO = float(os.environ.get("THREADPOOL_WARN_RATIO", "0.9"))
+
+# Preenchido pelo middleware para requisições autorizadas: {"id": ..., "path": ...}
+_current_profile: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_profile", default=None)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(PROFILING_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_ADMIN_TOKEN)
+
+
+def profile_path(profile_id: str) -> Path:
+    return Path(PROFILE_DIR) / f"{profile_id}.txt"
+
+
+def _save_report(profile: Dict[str, Any], profiler: cProfile.Profile, seconds: float) -> None:
+    out = io.StringIO()
+    out.write(f"{profile['method']} {profile['path']} - {seconds * 1000:.1f} ms\n\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    path = profile_path(profile["id"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(out.getvalue(), encoding="utf-8")
+    profiler.dump_stats(path.with_suffix(".prof"))
+    profile["saved"] = True
+    print(f"🔬 Profile da requisição {profile['path']} gravado em {path}")
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Roda o endpoint sob o cProfile quando a requisição foi marcada pelo middleware.
+    Deve ficar abaixo do decorador de rota (`@app.get`/`@app.post`).
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return await func(*args, **kwargs)
+            # No event loop o cProfile também vê as outras tarefas em andamento
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                _save_report(profile, profiler, time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            _save_report(profile, profiler, time.perf_counter() - start)
+    return wrapper
+
+
+async def profiling_middleware(request: Request, call_next):
+    token = request.headers.get("x-profile") or request.query_params.get("profile")
+    if not is_admin(token):
+        return await call_next(request)
+
+    profile = {"id": uuid.uuid4().hex, "method": request.method, "path": request.url.path, "saved": False}
+    reset = _current_profile.set(profile)
+    try:
+        response = await call_next(request)
+    finally:
+        _current_profile.reset(reset)
+    if profile["saved"]:
+        response.headers["X-Profile-Id"] = profile["id"]
+    return response
+
+
+async def monitor_event_loop(interval: float = LOOP_MONITOR_INTERVAL) -> None:
+    """
+    Dorme `interval` segundos em loop; o que passar disso é tempo em que o event
+    loop ficou bloqueado. Também acompanha o limitador de threads do AnyIO, usado
+    pelo FastAPI para os endpoints síncronos.
+    """
+    limiter = to_thread.current_default_thread_limiter()
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = time.perf_counter() - start - interval
+        EVENT_LOOP_LAG.observe(max(lag, 0.0))
+        if lag * 1000 >= LOOP_LAG_WARN_MS:
+            print(f"⚠️ Event loop bloqueado por {lag * 1000:.0f} ms")
+
+        in_use, total = limiter.borrowed_tokens, limiter.total_tokens
+        THREADPOOL_IN_USE.set(in_use)
+        THREADPOOL_SIZE.set(total)
+        if total and in_use / total >= THREADPOOL_WARN_RATIO:
+            print(f"⚠️ Pool de threads saturado: {in_use}/{total} threads ocupadas")
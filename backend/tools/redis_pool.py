@@ -0,0 +1,69 @@
+# backend/tools/redis_pool.py
+"""
+Fábrica única de clientes Redis do backend.
+
+Todos os componentes (busca vetorial, RedisTimeSeries, cache de metadados,
+config_schema) pegam seus clientes aqui e compartilham um pool de conexões
+por URL, com limite de conexões, timeouts, health check e retentativas.
+"""
+import os
+import threading
+from typing import Dict
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+
+from tools.metrics import REDIS_POOL_CONNECTIONS
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:8999")
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+# Tempo máximo esperando uma conexão livre quando o pool está cheio
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", "10"))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "10"))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.environ.get("REDIS_SOCKET_CONNECT_TIMEOUT", "5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+REDIS_RETRY_ATTEMPTS = int(os.environ.get("REDIS_RETRY_ATTEMPTS", "3"))
+
+_pools: Dict[str, redis.BlockingConnectionPool] = {}
+_lock = threading.Lock()
+
+
+def pool_stats(pool: redis.BlockingConnectionPool) -> Dict[str, int]:
+    """Conexões em uso, ociosas e o limite do pool."""
+    with pool._lock:
+        created = len(pool._connections)
+        idle = sum(1 for conn in pool.pool.queue if conn is not None)
+    return {"in_use": created - idle, "idle": idle, "max": pool.max_connections}
+
+
+def _register_metrics(name: str, pool: redis.BlockingConnectionPool) -> None:
+    for state in ("in_use", "idle", "max"):
+        REDIS_POOL_CONNECTIONS.labels(name, state).set_function(lambda state=state: pool_stats(pool)[state])
+
+
+def get_pool(url: str = REDIS_URL) -> redis.BlockingConnectionPool:
+    with _lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = redis.BlockingConnectionPool.from_url(
+                url,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+                socket_keepalive=True,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+                retry=Retry(ExponentialBackoff(cap=1.0, base=0.05), REDIS_RETRY_ATTEMPTS),
+                retry_on_error=[ConnectionError, TimeoutError],
+            )
+            _pools[url] = pool
+            # O rótulo não leva a URL, que pode conter senha
+            _register_metrics(f"pool{len(_pools)}", pool)
+        return pool
+
+
+def get_redis(url: str = REDIS_URL) -> redis.Redis:
+    """Cliente Redis sobre o pool compartilhado da URL."""
+    return redis.Redis(connection_pool=get_pool(url))
@@ -0,0 +1,187 @@
+# backend/tools/reindex.py
+"""
+Reindexação sem downtime com índices versionados e o alias INDEX_ALIAS.
+
+As buscas do backend vão sempre para o alias (ver RedisVectorStore). Para mudar
+o schema, o tipo do vetor ou o modelo de embeddings:
+
+1. `build` cria ao lado do índice vivo um índice novo, com nome e prefixo
+   próprios (`idx:ipea_v2`, `doc:ipea_v2:`), e indexa o catálogo nele;
+2. `swap` confere o índice novo e troca o alias com um único FT.ALIASUPDATE:
+   as buscas passam de um índice completo para outro, sem janela vazia;
+3. `gc` apaga as chaves do índice antigo em lotes, com limite de chaves por
+   segundo para não competir com o tráfego, e por fim remove o índice.
+
+Uso (a partir de backend/):
+
+    python -m tools.reindex status
+    REDIS_VECTOR_ALGORITHM=HNSW python -m tools.reindex build --version 2 --workers 4
+    python -m tools.reindex swap --version 2 --gc
+
+Ao trocar o modelo de embeddings, reinicie o backend com o novo
+SENTENCE_TRANSFORMER_MODEL logo após o `swap`, para que as perguntas sejam
+embedadas com o mesmo modelo do índice.
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Tuple
+
+import redis
+from tabulate import tabulate
+from tqdm import tqdm
+
+from rag.index_keys import DOC_PREFIX, INDEX_ALIAS, INDEX_NAME, index_identity, live_index
+from tools.redis_pool import REDIS_URL, get_redis
+
+# Chaves apagadas por segundo pelo gc
+REINDEX_GC_RATE = float(os.environ.get("REINDEX_GC_RATE", "5000"))
+GC_BATCH = 500
+
+
+def version_names(version: str) -> Tuple[str, str]:
+    """Nome do índice e prefixo das chaves de uma versão (`idx:ipea_v2`, `doc:ipea_v2:`)."""
+    return f"{INDEX_NAME}_v{version}", f"{DOC_PREFIX.rstrip(':')}_v{version}:"
+
+
+def list_indexes(r: redis.Redis) -> List[dict]:
+    live = live_index(r)
+    rows = []
+    for name in sorted(n.decode("utf-8") if isinstance(n, bytes) else n for n in r.execute_command("FT._LIST")):
+        info = r.ft(name).info()
+        _, prefix = index_identity(info)
+        rows.append({
+            "índice": name,
+            "prefixo": prefix,
+            "docs": int(info.get("num_docs", 0)),
+            "vetores_mb": round(float(info.get("vector_index_sz_mb", 0)), 2),
+            "vivo": "✅" if live and live[0] == name else "",
+        })
+    return rows
+
+
+def build(version: str, workers: int, threads_per_worker: int, layout: str, start: int = 0) -> None:
+    # Importado aqui: carrega o modelo de embeddings
+    from rag.embedding import RedisVectorStore
+    from tools.index_data import index_all_series
+
+    index_name, prefix = version_names(version)
+    live = live_index(get_redis(REDIS_URL))
+    if live and live[0] == index_name:
+        raise SystemExit(f"❌ {index_name} já é o índice vivo; use outra versão.")
+    print(f"Construindo {index_name} (prefixo {prefix}) ao lado de {live[0] if live else 'nenhum índice vivo'}...")
+    index_all_series(workers, threads_per_worker, layout, start, index_name=index_name, prefix=prefix)
+    RedisVectorStore(index_name=index_name, prefix=prefix).wait_indexed()
+    print(f"✅ {index_name} pronto. Troque o alias com: python -m tools.reindex swap --version {version}")
+
+
+def swap(r: redis.Redis, index_name: str, alias: str = INDEX_ALIAS, min_ratio: float = 0.9) -> Optional[str]:
+    """
+    Aponta o alias para `index_name` de forma atômica e retorna o índice anterior.
+    Recusa índices ainda indexando ou com menos de `min_ratio` dos docs do atual.
+    """
+    info = r.ft(index_name).info()
+    if float(info.get("percent_indexed", 1)) < 1 or int(info.get("indexing", 0)):
+        raise RuntimeError(f"{index_name} ainda está indexando.")
+    new_docs = int(info.get("num_docs", 0))
+    live = live_index(r, alias)
+    if live is None:
+        r.ft(index_name).aliasadd(alias)
+        return None
+    if live[0] == index_name:
+        raise RuntimeError(f"O alias {alias} já aponta para {index_name}.")
+    live_docs = int(r.ft(live[0]).info().get("num_docs", 0))
+    if new_docs < live_docs * min_ratio:
+        raise RuntimeError(
+            f"{index_name} tem {new_docs} docs contra {live_docs} do índice vivo {live[0]}; "
+            f"use --min-ratio para forçar."
+        )
+    r.ft(index_name).aliasupdate(alias)
+    return live[0]
+
+
+def gc(r: redis.Redis, index_name: str, alias: str = INDEX_ALIAS, rate: float = REINDEX_GC_RATE) -> int:
+    """
+    Apaga as chaves de um índice que não é mais o vivo, em pipelines de GC_BATCH
+    UNLINKs limitados a `rate` chaves por segundo, e depois remove o índice.
+    Pode ser interrompido e rodado de novo.
+    """
+    _, prefix = index_identity(r.ft(index_name).info())
+    live = live_index(r, alias)
+    if live and live[0] == index_name:
+        raise RuntimeError(f"{index_name} é o índice vivo; não pode ser apagado.")
+    if live and live[1].startswith(prefix):
+        raise RuntimeError(f"O prefixo {prefix} também cobre as chaves do índice vivo ({live[1]}).")
+
+    deleted = 0
+    progress = tqdm(desc=f"Apagando {prefix}*", unit="chaves")
+    batch: List[bytes] = []
+
+    def flush() -> None:
+        nonlocal deleted
+        started = time.monotonic()
+        pipe = r.pipeline(transaction=False)
+        for key in batch:
+            pipe.unlink(key)
+        pipe.execute()
+        deleted += len(batch)
+        progress.update(len(batch))
+        # Limite de vazão: cada lote ocupa pelo menos len(batch) / rate segundos
+        if rate:
+            time.sleep(max(0.0, len(batch) / rate - (time.monotonic() - started)))
+        batch.clear()
+
+    for key in r.scan_iter(f"{prefix}*", count=GC_BATCH):
+        batch.append(key)
+        if len(batch) == GC_BATCH:
+            flush()
+    if batch:
+        flush()
+    progress.close()
+
+    r.ft(index_name).dropindex(delete_documents=False)
+    return deleted
+
+
+if __name__ == "__main__":
+    from tools.index_data import INDEX_LAYOUT, INDEX_THREADS_PER_WORKER, INDEX_WORKERS, LAYOUTS
+
+    parser = argparse.ArgumentParser(description="Reindexação sem downtime com índices versionados.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Lista os índices e mostra para qual o alias aponta")
+
+    build_p = sub.add_parser("build", help="Constrói uma nova versão ao lado do índice vivo")
+    build_p.add_argument("--version", required=True)
+    build_p.add_argument("--workers", type=int, default=INDEX_WORKERS)
+    build_p.add_argument("--threads-per-worker", type=int, default=INDEX_THREADS_PER_WORKER)
+    build_p.add_argument("--layout", choices=LAYOUTS, default=INDEX_LAYOUT)
+    build_p.add_argument("--start", type=int, default=0, help="Pula os N primeiros códigos (para retomar)")
+
+    swap_p = sub.add_parser("swap", help="Aponta o alias para a versão (FT.ALIASUPDATE)")
+    swap_p.add_argument("--version", required=True)
+    swap_p.add_argument("--min-ratio", type=float, default=0.9,
+                        help="Mínimo de docs da nova versão em relação ao índice vivo")
+    swap_p.add_argument("--gc", action="store_true", help="Apaga o índice anterior logo após a troca")
+    swap_p.add_argument("--rate", type=float, default=REINDEX_GC_RATE, help="Chaves apagadas por segundo")
+
+    gc_p = sub.add_parser("gc", help="Apaga as chaves e o índice de uma versão antiga")
+    gc_p.add_argument("--index", required=True, help=f"Nome do índice antigo (ex.: {INDEX_NAME})")
+    gc_p.add_argument("--rate", type=float, default=REINDEX_GC_RATE, help="Chaves apagadas por segundo")
+
+    args = parser.parse_args()
+    r = get_redis(REDIS_URL)
+
+    if args.command == "status":
+        live = live_index(r)
+        print(f"Alias {INDEX_ALIAS} -> {live[0] if live else '(não existe)'}")
+        print(tabulate(list_indexes(r), headers="keys", tablefmt="github"))
+    elif args.command == "build":
+        build(args.version, args.workers, args.threads_per_worker, args.layout, args.start)
+    elif args.command == "swap":
+        index_name, _ = version_names(args.version)
+        previous = swap(r, index_name, min_ratio=args.min_ratio)
+        print(f"✅ Alias {INDEX_ALIAS} agora aponta para {index_name} (antes: {previous or 'nenhum'}).")
+        if args.gc and previous:
+            print(f"✅ {gc(r, previous, rate=args.rate)} chaves de {previous} apagadas.")
+    else:
+        print(f"✅ {gc(r, args.index, rate=args.rate)} chaves de {args.index} apagadas.")
@@ -0,0 +1,55 @@
+# backend/tools/sync_warehouse.py
+import argparse
+
+from tqdm import tqdm
+
+from tools.datasource import ipea, parse_timeseries
+from tools.warehouse import WAREHOUSE_DIR, observations_path, write_metadata, write_series_partition
+
+
+def sync_warehouse(base_dir: str = WAREHOUSE_DIR, refresh: bool = False, limit: int = 0):
+    """
+    Preenche o armazém Parquet com o catálogo e as observações do IPEA.
+
+    Séries que já têm partição são puladas, a menos que `refresh` seja True,
+    de modo que uma execução interrompida pode ser retomada.
+    """
+    print("Obtendo metadados de todas as séries do IPEA...")
+    meta_df = ipea.metadata()
+    write_metadata(meta_df, base_dir)
+    all_codes = meta_df["CODE"].dropna().unique().tolist()
+    if limit:
+        all_codes = all_codes[:limit]
+    print(f"✅ {len(all_codes)} códigos encontrados.")
+
+    total_series = 0
+    total_records = 0
+    for ser_code in tqdm(all_codes, desc="Sincronizando séries"):
+        if not refresh and observations_path(ser_code, base_dir).exists():
+            continue
+        try:
+            df = ipea.timeseries(ser_code)
+        except Exception as e:
+            print(f"Erro na série {ser_code}: {e}")
+            continue
+        if df.empty:
+            continue
+
+        # Mesmas datas do RedisTimeSeries (tools.ipeadata.load_series)
+        series = parse_timeseries(df)
+        if series.empty:
+            continue
+
+        total_records += write_series_partition(ser_code, series, base_dir)
+        total_series += 1
+
+    print(f"\n✅ Sincronização completa: {total_series} séries, {total_records} registros.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sincroniza o armazém Parquet/DuckDB com o IPEA.")
+    parser.add_argument("--dir", default=WAREHOUSE_DIR, help="Diretório do armazém")
+    parser.add_argument("--refresh", action="store_true", help="Baixa novamente séries já sincronizadas")
+    parser.add_argument("--limit", type=int, default=0, help="Sincroniza apenas as N primeiras séries")
+    args = parser.parse_args()
+    sync_warehouse(args.dir, refresh=args.refresh, limit=args.limit)
@@ -0,0 +1,153 @@
+# backend/tools/timeseries_store.py
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import redis
+
+from rag.context_builder import RESOLUTIONS, resample_series
+from tools.ipeadata import load_series
+from tools.metrics import record_cache
+from tools.redis_pool import get_redis
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:8999")
+TS_PREFIX = os.environ.get("REDIS_TS_PREFIX", "ts:ipea:")
+
+# O RedisTimeSeries só aceita timestamps positivos e várias séries do IPEA
+# começam antes de 1970, então os timestamps são contados a partir desta data,
+# o primeiro dia inteiro representável pelo pandas em nanossegundos. Cada chave
+# leva o rótulo `epoch`: chaves gravadas com outra origem são regravadas.
+TS_EPOCH = pd.Timestamp("1677-09-22")
+TS_MAX = pd.Timestamp.max.floor("D")
+EPOCH_LABEL = TS_EPOCH.strftime("%Y-%m-%d")
+MS = 1_000_000  # nanossegundos por milissegundo
+MADD_BATCH_SIZE = 10_000
+
+
+def _to_ts(index: pd.DatetimeIndex) -> np.ndarray:
+    # Em milissegundos: em nanossegundos a diferença para TS_EPOCH estoura o int64
+    return index.as_unit("ms").asi8 - TS_EPOCH.value // MS
+
+
+def _bound(ts: Optional[pd.Timestamp], default: str):
+    if ts is None:
+        return default
+    # Períodos fora do intervalo (ex.: "de 1500 a 1600") são limitados a ele em vez de gerar timestamps negativos
+    ts = min(max(pd.Timestamp(ts), TS_EPOCH), TS_MAX)
+    return int(_to_ts(pd.DatetimeIndex([ts]))[0])
+
+
+def _from_ts(timestamps) -> pd.DatetimeIndex:
+    return pd.to_datetime(np.asarray(timestamps, dtype=np.int64) + TS_EPOCH.value // MS, unit="ms").as_unit("ns")
+
+
+class SeriesTimeSeriesStore:
+    """
+    Guarda as observações de cada série em chaves `TS` do RedisTimeSeries.
+
+    Para cada série são criadas uma chave com os dados originais e uma chave por
+    agregação (mensal, trimestral e anual), todas com os rótulos `sercodigo` e
+    `resolution`. Assim, todas as resoluções de um período são lidas com um único
+    `TS.MRANGE`, sem chamadas ao IPEA nem resample no pandas durante a requisição.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.r = redis_client or get_redis(REDIS_URL)
+        self.ts = self.r.ts()
+
+    def key(self, sercodigo: str, resolution: str = "original") -> str:
+        if resolution == "original":
+            return f"{TS_PREFIX}{sercodigo}"
+        return f"{TS_PREFIX}{sercodigo}:{resolution}"
+
+    def has_series(self, sercodigo: str) -> bool:
+        # Pelos rótulos, e não pela chave: chaves de outra origem de timestamps não contam
+        return bool(self.ts.queryindex([f"sercodigo={sercodigo}", "resolution=original", f"epoch={EPOCH_LABEL}"]))
+
+    def write_series(self, sercodigo: str, series: pd.Series) -> int:
+        """
+        (Re)escreve uma série e suas agregações.
+
+        As agregações usam períodos do calendário (meses e anos têm durações
+        diferentes), por isso são calculadas aqui, na escrita, em vez de regras
+        `TS.CREATERULE`, que só trabalham com intervalos de duração fixa.
+
+        Tudo roda em um MULTI/EXEC: uma leitura concorrente (TS.MRANGE) vê a série
+        antiga ou a nova, nunca as chaves apagadas e ainda não recriadas.
+        """
+        series = series.dropna().sort_index()
+        if len(series) and series.index[0] < TS_EPOCH:
+            print(f"⚠️ Série {sercodigo}: observações anteriores a {EPOCH_LABEL} descartadas.")
+            series = series[series.index >= TS_EPOCH]
+        pipe = self.ts.pipeline(transaction=True)
+        for name, rule, _ in RESOLUTIONS:
+            key = self.key(sercodigo, name)
+            values = resample_series(series, rule)
+            pipe.unlink(key)
+            pipe.create(
+                key,
+                labels={"sercodigo": sercodigo, "resolution": name, "epoch": EPOCH_LABEL},
+                duplicate_policy="last",
+            )
+            samples = list(zip([key] * len(values), _to_ts(values.index).tolist(), values.to_numpy(dtype=np.float64).tolist()))
+            for i in range(0, len(samples), MADD_BATCH_SIZE):
+                pipe.madd(samples[i:i + MADD_BATCH_SIZE])
+        pipe.execute()
+        return len(series)
+
+    def ensure_series(self, sercodigo: str) -> None:
+        """
+        Garante que a série está no Redis; na primeira consulta ela é baixada do
+        IPEA e gravada, e as seguintes não saem mais do Redis.
+        """
+        hit = self.has_series(sercodigo)
+        record_cache("timeseries_store", hit)
+        if not hit:
+            print(f"Série {sercodigo} ausente do RedisTimeSeries; carregando do IPEA...")
+            self.write_series(sercodigo, load_series(sercodigo))
+
+    def get_frames(
+        self,
+        sercodigo: str,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> Optional[Dict[str, pd.Series]]:
+        """
+        Lê a série e todas as suas agregações no período [start, end] com um
+        único `TS.MRANGE`. Retorna None se a série não estiver no Redis.
+        """
+        res = self.ts.mrange(
+            _bound(start, "-"), _bound(end, "+"),
+            filters=[f"sercodigo={sercodigo}", f"epoch={EPOCH_LABEL}"], with_labels=True,
+        )
+
+        frames: Dict[str, pd.Series] = {}
+        for item in res:
+            for _, payload in item.items():
+                labels, samples = payload[0], payload[-1]
+                resolution = labels.get("resolution") or labels.get(b"resolution")
+                if isinstance(resolution, bytes):
+                    resolution = resolution.decode()
+                timestamps = [s[0] for s in samples]
+                values = [float(s[1]) for s in samples]
+                frames[resolution] = pd.Series(values, index=_from_ts(timestamps), dtype=np.float64)
+
+        if "original" not in frames:
+            return None
+        return frames
+
+    def get_range(
+        self,
+        sercodigo: str,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        resolution: str = "original",
+    ) -> pd.Series:
+        """Lê uma única resolução com `TS.RANGE`."""
+        samples = self.ts.range(self.key(sercodigo, resolution), _bound(start, "-"), _bound(end, "+"))
+        return pd.Series(
+            [float(s[1]) for s in samples],
+            index=_from_ts([s[0] for s in samples]),
+            dtype=np.float64,
+        )
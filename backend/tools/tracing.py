@@ -0,0 +1,105 @@
+# backend/tools/tracing.py
+"""
+Tracing com OpenTelemetry, desligado por padrão (OTEL_TRACES_EXPORTER=none).
+
+- file:    grava um span por linha (JSON) em OTEL_TRACES_FILE, sem serviço externo;
+- otlp:    envia a um coletor local (OTEL_EXPORTER_OTLP_ENDPOINT, padrão http://localhost:4318);
+- console: imprime os spans no log.
+
+Os spans do FastAPI, das chamadas HTTP de saída (Tika, Ollama, OpenAI) e dos
+comandos Redis vêm da auto-instrumentação; cada `stage_timer` abre um span
+filho "<endpoint>.<etapa>". O contexto chega da UI pelo cabeçalho `traceparent`.
+
+O módulo não exige o OpenTelemetry instalado para ser importado. A UI tem a sua
+própria versão, ui/tracing.py, pois roda em outro contêiner.
+"""
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional
+
+OTEL_TRACES_EXPORTER = os.environ.get("OTEL_TRACES_EXPORTER", "none")
+OTEL_TRACES_FILE = os.environ.get("OTEL_TRACES_FILE", "traces/backend.jsonl")
+OTEL_SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "inspector-backend")
+
+
+class _NoopTracer:
+    """Usado quando nem o opentelemetry-api está instalado."""
+
+    def start_as_current_span(self, name: str, *args, **kwargs):
+        return nullcontext()
+
+
+def get_tracer(name: str):
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return _NoopTracer()
+    return trace.get_tracer(name)
+
+
+tracer = get_tracer("inspector")
+
+
+def _span_exporter(kind: str, traces_file: str):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if kind == "file":
+        Path(traces_file).parent.mkdir(parents=True, exist_ok=True)
+        # Um span por linha (JSON); o exportador faz flush a cada lote
+        return ConsoleSpanExporter(
+            out=open(traces_file, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if kind == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"OTEL_TRACES_EXPORTER inválido: '{kind}'. Use none, file, otlp ou console.")
+
+
+def start_tracing(kind: str, service_name: str, traces_file: str) -> bool:
+    """
+    Registra o provedor de traces com o exportador `kind` e instrumenta o
+    `requests` (que propaga o `traceparent`). Sem o SDK instalado, ou com o
+    exportador `none`, os spans continuam sendo no-ops.
+    """
+    if kind == "none":
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        print(f"⚠️ Tracing desativado: pacotes do OpenTelemetry ausentes ({e}).")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(_span_exporter(kind, traces_file)))
+    trace.set_tracer_provider(provider)
+    RequestsInstrumentor().instrument()
+    print(f"🔭 Tracing ativo ({kind}) para o serviço {service_name}.")
+    return True
+
+
+def setup_tracing(app=None, exporter: Optional[str] = None) -> bool:
+    """Tracing do backend: o de `start_tracing` mais httpx, Redis e FastAPI."""
+    if not start_tracing(exporter or OTEL_TRACES_EXPORTER, OTEL_SERVICE_NAME, OTEL_TRACES_FILE):
+        return False
+    try:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+        from opentelemetry.instrumentation.redis import RedisInstrumentor
+    except ImportError as e:
+        print(f"⚠️ Auto-instrumentação parcial: pacotes do OpenTelemetry ausentes ({e}).")
+        return True
+
+    HTTPXClientInstrumentor().instrument()
+    RedisInstrumentor().instrument()
+    if app is not None:
+        # /metrics, /health e /ready são chamados o tempo todo e só poluiriam os traces
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics,health,ready")
+    return True
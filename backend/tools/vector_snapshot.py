@@ -0,0 +1,247 @@
+# backend/tools/vector_snapshot.py
+"""
+Snapshot do índice vetorial em Parquet, para provisionar um ambiente novo sem
+refazer os embeddings.
+
+Cada linha guarda o id do documento (a chave sem o prefixo), os demais campos da
+hash (`fields`, map<string, string>) e o vetor como `fixed_size_binary`, nulo
+nas observações do layout normalizado. Os metadados do arquivo registram o
+modelo, a dimensão e o tipo dos vetores; a importação recusa um snapshot
+incompatível com o modelo configurado.
+
+A importação cria o índice (ou confere se o existente guarda vetores do mesmo
+tipo e dimensão), grava as hashes em pipelines, espera o RediSearch terminar de
+indexar e confere que nenhum documento foi recusado. Sem `--version`, carrega
+no índice vivo (ou cria `idx:ipea` e o alias, num Redis vazio); com
+`--version`, em um índice versionado, pronto para `python -m tools.reindex swap`.
+
+O subcomando `mmap` gera, do índice vivo ou de um snapshot, os arquivos do
+backend de busca em processo (VECTOR_BACKEND=numpy, ver rag/mmap_store.py).
+
+As séries do RedisTimeSeries e o catálogo de metadados não fazem parte do
+snapshot: são recarregados do IPEA sob demanda.
+
+Uso (a partir de backend/):
+
+    python -m tools.vector_snapshot export ipea_vectors.parquet
+    python -m tools.vector_snapshot import ipea_vectors.parquet
+    python -m tools.vector_snapshot import ipea_vectors.parquet --version 3
+    python -m tools.vector_snapshot mmap --from-parquet ipea_vectors.parquet
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import redis
+from tqdm import tqdm
+
+from rag.embedding import EMBED_DIM, MODEL_NAME, NUMPY_DTYPES, VECTOR_ALGORITHM, create_vector_index, wait_indexed
+from rag.index_keys import DOC_PREFIX, INDEX_ALIAS, INDEX_NAME, _decode, index_identity, live_index, vector_field
+from rag.mmap_store import VECTOR_MMAP_PATH, write_mmap_index
+from tools.redis_pool import REDIS_URL, get_redis
+from tools.reindex import version_names
+
+SNAPSHOT_BATCH = 5000
+DTYPE_BY_ITEMSIZE = {4: "FLOAT32", 2: "FLOAT16"}
+
+
+def snapshot_schema(vector_bytes: int) -> pa.Schema:
+    return pa.schema([
+        pa.field("id", pa.string(), nullable=False),
+        pa.field("fields", pa.map_(pa.string(), pa.string())),
+        pa.field("vector", pa.binary(vector_bytes)),
+    ])
+
+
+def _read_batches(r: redis.Redis, prefix: str) -> Iterator[List[Tuple[str, Dict[str, str], Optional[bytes]]]]:
+    keys = list(r.scan_iter(f"{prefix}*", count=SNAPSHOT_BATCH))
+    for i in tqdm(range(0, len(keys), SNAPSHOT_BATCH), desc="Exportando"):
+        chunk = keys[i:i + SNAPSHOT_BATCH]
+        pipe = r.pipeline(transaction=False)
+        for key in chunk:
+            pipe.hgetall(key)
+        rows = []
+        for key, mapping in zip(chunk, pipe.execute()):
+            if not mapping:
+                continue
+            vector = mapping.pop(b"vector", None)
+            fields = {_decode(k): _decode(v) for k, v in mapping.items()}
+            rows.append((_decode(key)[len(prefix):], fields, vector))
+        yield rows
+
+
+def _table(rows: List[Tuple[str, Dict[str, str], Optional[bytes]]], schema: pa.Schema) -> pa.Table:
+    return pa.table(
+        {
+            "id": [doc_id for doc_id, _, _ in rows],
+            "fields": [list(fields.items()) for _, fields, _ in rows],
+            "vector": [vec for _, _, vec in rows],
+        },
+        schema=schema,
+    )
+
+
+def export_snapshot(r: redis.Redis, index_name: str, path: str) -> int:
+    _, prefix = index_identity(r.ft(index_name).info())
+    writer = None
+    # Linhas lidas antes do primeiro vetor, que define o tamanho do fixed_size_binary
+    pending: List[Tuple[str, Dict[str, str], Optional[bytes]]] = []
+    total = 0
+    try:
+        for rows in _read_batches(r, prefix):
+            sizes = {len(vec) for _, _, vec in rows if vec is not None}
+            if writer is None:
+                if not sizes:
+                    pending.extend(rows)
+                    continue
+                vector_bytes = min(sizes)
+                metadata = {
+                    "model": MODEL_NAME,
+                    "dim": str(EMBED_DIM),
+                    "dtype": DTYPE_BY_ITEMSIZE[vector_bytes // EMBED_DIM],
+                    "source_index": index_name,
+                    "source_prefix": prefix,
+                    "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                writer = pq.ParquetWriter(path, snapshot_schema(vector_bytes).with_metadata(metadata), compression="zstd")
+                rows, pending = pending + rows, []
+            if sizes - {writer.schema.field("vector").type.byte_width}:
+                raise ValueError("Vetores com tamanhos diferentes no mesmo índice.")
+            writer.write_table(_table(rows, writer.schema))
+            total += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    if pending:
+        raise ValueError(f"Nenhum vetor encontrado em {prefix}*; nada a exportar.")
+    return total
+
+
+def snapshot_metadata(path: str) -> Dict[str, str]:
+    raw = pq.read_schema(path).metadata or {}
+    return {_decode(k): _decode(v) for k, v in raw.items()}
+
+
+def check_compatible(metadata: Dict[str, str]) -> None:
+    """O snapshot precisa ter sido gerado com o mesmo modelo (e dimensão) usado nas consultas."""
+    if metadata.get("model") != MODEL_NAME or int(metadata.get("dim", 0)) != EMBED_DIM:
+        raise ValueError(
+            f"Snapshot gerado com {metadata.get('model')} (dim {metadata.get('dim')}), "
+            f"mas o backend usa {MODEL_NAME} (dim {EMBED_DIM})."
+        )
+
+
+def _snapshot_batches(path: str, desc: str) -> Iterator[List[Tuple[str, Dict[str, str], Optional[bytes]]]]:
+    parquet = pq.ParquetFile(path)
+    with tqdm(total=parquet.metadata.num_rows, desc=desc) as progress:
+        for batch in parquet.iter_batches(batch_size=SNAPSHOT_BATCH):
+            ids, fields, vectors = (batch.column(name).to_pylist() for name in ("id", "fields", "vector"))
+            yield [(doc_id, dict(doc_fields), vector) for doc_id, doc_fields, vector in zip(ids, fields, vectors)]
+            progress.update(len(ids))
+
+
+def check_index_matches(info: Dict[str, Any], metadata: Dict[str, str]) -> None:
+    """
+    Um índice que já existe precisa ter o tipo e a dimensão dos vetores do
+    snapshot: o RediSearch não indexa vetores de outro tamanho e não acusa erro.
+    """
+    field = vector_field(info)
+    if field is None:
+        print("⚠️ FT.INFO não informa o tipo dos vetores; a conferência fica para depois da carga.")
+        return
+    if str(field["data_type"]).upper() != metadata["dtype"] or int(field["dim"]) != int(metadata["dim"]):
+        raise ValueError(
+            f"O índice {_decode(info['index_name'])} guarda vetores {field['data_type']} (dim {field['dim']}), "
+            f"mas o snapshot tem {metadata['dtype']} (dim {metadata['dim']}); importe com --version."
+        )
+
+
+def import_snapshot(r: redis.Redis, path: str, index_name: str, prefix: str,
+                    algorithm: str = VECTOR_ALGORITHM) -> int:
+    metadata = snapshot_metadata(path)
+    check_compatible(metadata)
+    create_vector_index(r, index_name, prefix, algorithm, metadata["dtype"])
+    info = r.ft(index_name).info()
+    check_index_matches(info, metadata)
+    failures_before = int(info.get("hash_indexing_failures", 0))
+
+    total = 0
+    for rows in _snapshot_batches(path, "Importando"):
+        pipe = r.pipeline(transaction=False)
+        for doc_id, mapping, vector in rows:
+            if vector is not None:
+                mapping["vector"] = vector
+            pipe.hset(f"{prefix}{doc_id}", mapping=mapping)
+        pipe.execute()
+        total += len(rows)
+    wait_indexed(r, index_name)
+
+    info = r.ft(index_name).info()
+    failures = int(info.get("hash_indexing_failures", 0)) - failures_before
+    if failures > 0 or int(info.get("num_docs", 0)) < total:
+        raise RuntimeError(
+            f"{index_name}: {failures} documentos recusados pelo RediSearch e {info.get('num_docs')} "
+            f"indexados de {total} importados; confira o tipo e a dimensão dos vetores."
+        )
+    return total
+
+
+def build_mmap_index(batches: Iterable[List[Tuple[str, Dict[str, str], Optional[bytes]]]], path: str) -> int:
+    """Gera o índice do backend numpy (rag/mmap_store.py) com os documentos que têm vetor."""
+    vectors, docs = [], []
+    for rows in batches:
+        for _, fields, vector in rows:
+            if vector is None:
+                continue
+            dtype = NUMPY_DTYPES[DTYPE_BY_ITEMSIZE[len(vector) // EMBED_DIM]]
+            vectors.append(np.frombuffer(vector, dtype=dtype))
+            docs.append({"sercodigo": fields.get("sercodigo", ""), "nome": fields.get("nome", "")})
+    write_mmap_index(path, np.vstack(vectors) if vectors else np.empty((0, EMBED_DIM), dtype=np.float32), docs)
+    return len(docs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta/importa o índice vetorial em Parquet.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_p = sub.add_parser("export", help="Grava o índice vivo (ou --index) em um arquivo Parquet")
+    export_p.add_argument("path")
+    export_p.add_argument("--index", help="Índice a exportar (padrão: o do alias)")
+    import_p = sub.add_parser("import", help="Carrega um snapshot no Redis")
+    import_p.add_argument("path")
+    import_p.add_argument("--version", help="Carrega em idx:ipea_vN em vez do índice vivo")
+    mmap_p = sub.add_parser("mmap", help="Gera o índice do backend numpy (VECTOR_BACKEND=numpy)")
+    mmap_p.add_argument("--from-parquet", help="Snapshot de origem (padrão: o índice vivo no Redis)")
+    mmap_p.add_argument("--output", default=VECTOR_MMAP_PATH, help="Caminho sem extensão (.npy/.json)")
+    args = parser.parse_args()
+
+    r = get_redis(REDIS_URL)
+    if args.command == "mmap":
+        if args.from_parquet:
+            check_compatible(snapshot_metadata(args.from_parquet))
+            batches = _snapshot_batches(args.from_parquet, "Lendo snapshot")
+        else:
+            _, prefix = live_index(r) or (INDEX_NAME, DOC_PREFIX)
+            batches = _read_batches(r, prefix)
+        total = build_mmap_index(batches, args.output)
+        print(f"✅ {total} vetores gravados em {args.output}.npy; use VECTOR_BACKEND=numpy VECTOR_MMAP_PATH={args.output}.")
+    elif args.command == "export":
+        index_name = args.index or (live_index(r) or (INDEX_NAME,))[0]
+        total = export_snapshot(r, index_name, args.path)
+        print(f"✅ {total} documentos de {index_name} exportados para {args.path}.")
+    else:
+        print(f"Snapshot: {json.dumps(snapshot_metadata(args.path), ensure_ascii=False)}")
+        live = live_index(r)
+        if args.version:
+            index_name, prefix = version_names(args.version)
+        else:
+            index_name, prefix = live or (INDEX_NAME, DOC_PREFIX)
+        total = import_snapshot(r, args.path, index_name, prefix)
+        if not args.version and live is None:
+            r.ft(index_name).aliasadd(INDEX_ALIAS)
+        print(f"✅ {total} documentos importados em {index_name}.")
+        if args.version:
+            print(f"Troque o alias com: python -m tools.reindex swap --version {args.version}")
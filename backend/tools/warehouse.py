@@ -0,0 +1,171 @@
+# backend/tools/warehouse.py
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import duckdb
+import pandas as pd
+
+WAREHOUSE_DIR = os.environ.get("WAREHOUSE_DIR", "warehouse")
+
+
+def observations_path(sercodigo: str, base_dir: str = WAREHOUSE_DIR) -> Path:
+    # Partição no estilo Hive: o DuckDB recupera a coluna `sercodigo` do caminho
+    return Path(base_dir) / "observations" / f"sercodigo={sercodigo}" / "data.parquet"
+
+
+def metadata_path(base_dir: str = WAREHOUSE_DIR) -> Path:
+    return Path(base_dir) / "metadata.parquet"
+
+
+def write_series_partition(sercodigo: str, series: pd.Series, base_dir: str = WAREHOUSE_DIR) -> int:
+    """Grava (ou substitui) a partição Parquet de uma série."""
+    path = observations_path(sercodigo, base_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame = pd.DataFrame({"date": series.index, "value": series.to_numpy(dtype="float64")})
+    tmp = path.with_suffix(".tmp")
+    frame.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    return len(frame)
+
+
+def write_metadata(metadata_df: pd.DataFrame, base_dir: str = WAREHOUSE_DIR) -> None:
+    path = metadata_path(base_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    metadata_df.astype(str).to_parquet(path, index=False)
+
+
+def _sql_literal(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+class Warehouse:
+    """
+    Camada de consulta analítica sobre o catálogo do IPEA em Parquet.
+
+    As agregações entre séries (rankings, comparações) são feitas pelo DuckDB
+    diretamente sobre os arquivos, sem chamar o IPEA durante a requisição.
+    """
+
+    def __init__(self, base_dir: str = WAREHOUSE_DIR):
+        self.base_dir = base_dir
+        self.con = duckdb.connect()
+        # Uma conexão DuckDB não deve ser usada por várias threads ao mesmo tempo
+        self._lock = threading.Lock()
+        # Views não aceitam parâmetros preparados, então os caminhos entram como literais
+        observations_glob = _sql_literal(Path(base_dir) / "observations" / "*" / "*.parquet")
+        self.con.execute(
+            f"CREATE VIEW observations AS SELECT * FROM read_parquet({observations_glob}, hive_partitioning = true)"
+        )
+        self.con.execute(f"CREATE VIEW metadata AS SELECT * FROM read_parquet({_sql_literal(metadata_path(base_dir))})")
+
+    @classmethod
+    def available(cls, base_dir: str = WAREHOUSE_DIR) -> bool:
+        # Uma sincronização interrompida pode deixar o diretório sem nenhuma partição (ou só um .tmp)
+        partitions = (Path(base_dir) / "observations").glob("*/*.parquet")
+        return metadata_path(base_dir).exists() and next(partitions, None) is not None
+
+    @classmethod
+    def open(cls, base_dir: str = WAREHOUSE_DIR) -> Optional["Warehouse"]:
+        """O armazém, ou None se ele não existe ou não pode ser lido (o backend segue sem ele)."""
+        if not cls.available(base_dir):
+            return None
+        try:
+            return cls(base_dir)
+        except duckdb.Error as e:
+            print(f"⚠️ Armazém em {base_dir} ilegível; comparações entre séries desativadas: {e}")
+            return None
+
+    def query(self, sql: str, params: Optional[list] = None) -> pd.DataFrame:
+        with self._lock:
+            return self.con.execute(sql, params or []).df()
+
+    def growth_ranking(
+        self,
+        codes: Optional[List[str]] = None,
+        start_year: Optional[int] = None,
+        end_year: Optional[int] = None,
+        top: int = 10,
+    ) -> pd.DataFrame:
+        """
+        Ranqueia séries pelo crescimento entre a média do primeiro e do último
+        ano do período.
+
+        Args:
+            codes (Optional[List[str]]): Séries a comparar; None compara o catálogo todo.
+            start_year (Optional[int]): Primeiro ano do período.
+            end_year (Optional[int]): Último ano do período.
+            top (int): Número de séries retornadas.
+
+        Returns:
+            pd.DataFrame: sercodigo, nome, ano_inicial, valor_inicial, ano_final,
+            valor_final e crescimento_pct, do maior para o menor crescimento.
+        """
+        filters, params = [], []
+        if codes:
+            filters.append("list_contains(?, sercodigo)")
+            params.append(list(codes))
+        if start_year:
+            filters.append("year(date) >= ?")
+            params.append(start_year)
+        if end_year:
+            filters.append("year(date) <= ?")
+            params.append(end_year)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        params.append(top)
+
+        sql = f"""
+            WITH annual AS (
+                SELECT sercodigo, year(date) AS ano, avg(value) AS valor
+                FROM observations
+                {where}
+                GROUP BY sercodigo, ano
+            ),
+            bounds AS (
+                SELECT
+                    sercodigo,
+                    min(ano) AS ano_inicial,
+                    arg_min(valor, ano) AS valor_inicial,
+                    max(ano) AS ano_final,
+                    arg_max(valor, ano) AS valor_final
+                FROM annual
+                GROUP BY sercodigo
+            )
+            SELECT
+                b.sercodigo,
+                m.NAME AS nome,
+                b.ano_inicial,
+                b.valor_inicial,
+                b.ano_final,
+                b.valor_final,
+                (b.valor_final / nullif(b.valor_inicial, 0) - 1) * 100 AS crescimento_pct
+            FROM bounds b
+            LEFT JOIN metadata m ON m.CODE = b.sercodigo
+            ORDER BY crescimento_pct DESC NULLS LAST
+            LIMIT ?
+        """
+        return self.query(sql, params)
+
+    def annual_means(
+        self, codes: List[str], start_year: Optional[int] = None, end_year: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Médias anuais das séries lado a lado (uma coluna por série)."""
+        filters, params = ["list_contains(?, sercodigo)"], [list(codes)]
+        if start_year:
+            filters.append("year(date) >= ?")
+            params.append(start_year)
+        if end_year:
+            filters.append("year(date) <= ?")
+            params.append(end_year)
+        long = self.query(
+            f"""
+            SELECT sercodigo, year(date) AS ano, avg(value) AS valor
+            FROM observations
+            WHERE {' AND '.join(filters)}
+            GROUP BY sercodigo, ano
+            ORDER BY ano
+            """,
+            params,
+        )
+        return long.pivot(index="ano", columns="sercodigo", values="valor")
@@ -0,0 +1,96 @@
+"""
+Micro-benchmarks dos helpers executados a cada requisição.
+
+Rodar e gravar um baseline (a partir da raiz do repositório):
+
+    python -m pytest tests/benchmarks --benchmark-only \
+        --benchmark-storage=tests/benchmarks/baselines --benchmark-save=baseline
+
+Comparar com o último baseline gravado, falhando se o tempo mínimo piorar mais de 30%
+(o mínimo é menos sensível a ruído da máquina do que a média):
+
+    python -m pytest tests/benchmarks --benchmark-only \
+        --benchmark-storage=tests/benchmarks/baselines \
+        --benchmark-compare --benchmark-compare-fail=min:30%
+
+Os baselines ficam separados por plataforma/versão do Python; grave um novo na
+mesma máquina que fará a comparação.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from rag.context_builder import RESOLUTIONS, resample_series  # noqa: E402
+from rag.query_parsing import extract_year_range  # noqa: E402
+from rag.ranking import dedupe_series_results  # noqa: E402
+from tools.chart_data import series_chart_payload  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def tiktoken_encoding():
+    """SplitText e o orçamento de tokens dependem do arquivo de encoding do tiktoken."""
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        pytest.skip(f"Encoding do tiktoken indisponível: {e}")
+
+
+@pytest.fixture(scope="module")
+def daily_series():
+    """Série diária com 10 mil pontos, como as de câmbio e juros do IPEA."""
+    rng = np.random.default_rng(42)
+    index = pd.date_range("1990-01-01", periods=10_000, freq="D")
+    return pd.Series(100 + rng.standard_normal(10_000).cumsum(), index=index)
+
+
+@pytest.fixture(scope="module")
+def document_text():
+    """Texto de anexo com cerca de 500 páginas."""
+    paragraph = (
+        "O abate de frangos registrou crescimento expressivo na década, acompanhando "
+        "a expansão das exportações e a queda do preço relativo da proteína animal. "
+    )
+    return "\n\n".join(f"Página {p}. " + paragraph * 20 for p in range(500))
+
+
+def test_extract_year_range(benchmark):
+    question = "Como evoluiu o abate de frangos no Brasil entre 1995 e 2010, comparado a 2020?"
+    assert benchmark(extract_year_range, question) == (1995, 2010)
+
+
+def test_build_series_context(benchmark, daily_series, tiktoken_encoding):
+    from rag.context_builder import build_series_context
+
+    rollups = {name: resample_series(daily_series, rule) for name, rule, _ in RESOLUTIONS}
+    context = benchmark(
+        build_series_context, daily_series, "Taxa de câmbio", "BM_ERV", "Como evoluiu o câmbio?", rollups=rollups
+    )
+    assert "BM_ERV" in context
+
+
+def test_split_text(benchmark, document_text, tiktoken_encoding):
+    from model.split_text import SplitText
+
+    chunks = benchmark(SplitText(chunk_size=400).split_text, document_text)
+    assert len(chunks) > 500
+
+
+def test_series_chart_payload(benchmark, daily_series):
+    body = benchmark(series_chart_payload, "BM_ERV", daily_series, 1000)
+    assert b'"returned_points":1000' in body
+
+
+def test_dedupe_series_results(benchmark):
+    # k=10 busca 100 vizinhos; muitos são observações das mesmas séries
+    rng = np.random.default_rng(7)
+    docs = [
+        SimpleNamespace(sercodigo=f"SERIE_{rng.integers(30)}", nome="Série", score=str(score))
+        for score in np.sort(rng.random(100))
+    ]
+    result = benchmark(dedupe_series_results, docs, 10)
+    assert len(result) == 10
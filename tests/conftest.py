@@ -0,0 +1,6 @@
+import os
+import sys
+
+# O backend é executado a partir da sua própria pasta (ver backend/Dockerfile),
+# então seus módulos são importados como `rag.*`, `tools.*`, `llm.*`.
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend"))
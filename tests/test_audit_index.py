@@ -0,0 +1,45 @@
+from rag.index_keys import observation_doc_id
+from tools.audit_index import plan_compaction
+
+PREFIX = "doc:ipea:"
+
+
+def doc(key, sercodigo="ABATE", date="2010-01-01", has_vector=True, size=100):
+    return {"key": PREFIX + key, "sercodigo": sercodigo, "date": date, "has_vector": has_vector, "bytes": size}
+
+
+def test_observation_doc_id_is_the_same_for_every_date_format():
+    assert observation_doc_id("ABATE", "2010-01-01") == "ABATE:2010-01-01"
+    assert observation_doc_id("ABATE", "2010-01-01T00:00:00-03:00") == "ABATE:2010-01-01"
+
+
+def test_plan_keeps_one_canonical_doc_per_observation():
+    docs = [
+        doc("ABATE:0"),                      # id por posição (rag/retrieval.py antigo)
+        doc("ABATE:2010-01-01 00:00:00"),    # id por timestamp (indexadores antigos)
+        doc("ABATE:1", date="2010-02-01"),
+        doc("ABATE:2", date=None),           # sem data: órfão
+        doc("OUTRA:2010-01-01", sercodigo="OUTRA"),
+    ]
+
+    plan = plan_compaction(docs, PREFIX, known_codes={"ABATE"})
+
+    assert plan["duplicates"] == 1
+    assert plan["orphans"] == 2
+    assert set(plan["delete"]) == {PREFIX + "ABATE:2010-01-01 00:00:00", PREFIX + "ABATE:2", PREFIX + "OUTRA:2010-01-01"}
+    assert sorted(plan["rename"]) == [
+        (PREFIX + "ABATE:0", PREFIX + "ABATE:2010-01-01"),
+        (PREFIX + "ABATE:1", PREFIX + "ABATE:2010-02-01"),
+    ]
+    assert plan["per_series"]["ABATE"]["docs"] == 4
+    assert plan["reclaim_bytes"] == 300
+
+
+def test_normalized_observations_without_series_doc_are_orphans():
+    docs = [doc("ABATE:2010-01-01", has_vector=False), doc("FRANGO:2010-01-01", sercodigo="FRANGO", has_vector=False),
+            doc("FRANGO", sercodigo="FRANGO", date=None)]
+
+    plan = plan_compaction(docs, PREFIX)
+
+    assert plan["delete"] == [PREFIX + "ABATE:2010-01-01"]
+    assert plan["rename"] == []
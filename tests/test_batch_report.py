@@ -0,0 +1,50 @@
+import json
+import sys
+import types
+
+from tools.batch_report import completed_ids, read_questions, run_report
+
+
+def test_resume_skips_answered_questions_only(tmp_path):
+    output = tmp_path / "respostas.jsonl"
+    output.write_text(
+        json.dumps({"id": "1", "llm_text": "ok"}) + "\n"
+        + json.dumps({"id": "2", "error": "timeout"}) + "\n"
+        + '{"id": "3", "llm_te',  # linha truncada por uma interrupção
+        encoding="utf-8",
+    )
+
+    assert completed_ids(str(output)) == {"1"}
+    assert completed_ids(str(tmp_path / "inexistente.jsonl")) == set()
+
+
+def test_resume_appends_after_truncated_line(tmp_path, monkeypatch):
+    # run_report importa o main do backend; aqui só interessa a gravação do JSONL
+    monkeypatch.setitem(sys.modules, "main", types.SimpleNamespace(
+        store=None,
+        load_series_for_query=lambda sercodigo, endpoint: f"Série {sercodigo}",
+        build_query_context=lambda question, sercodigo, nome, compare, endpoint: question,
+        answer_with_context=lambda context, endpoint: f"resposta: {context}",
+    ))
+    questions = tmp_path / "perguntas.jsonl"
+    questions.write_text("".join(
+        json.dumps({"id": str(n), "question": f"Pergunta {n}", "sercodigo": "ABATE"}) + "\n" for n in (1, 2, 3)
+    ), encoding="utf-8")
+    output = tmp_path / "respostas.jsonl"
+    output.write_text(json.dumps({"id": "1", "llm_text": "ok"}) + "\n" + '{"id": "2", "llm_te', encoding="utf-8")
+
+    run_report(str(questions), str(output), concurrency=1)
+
+    results = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(result["id"] for result in results) == ["1", "2", "3"]
+    assert completed_ids(str(output)) == {"1", "2", "3"}
+
+
+def test_read_questions_defaults_id_and_sercodigo(tmp_path):
+    path = tmp_path / "perguntas.csv"
+    path.write_text("question,sercodigo\nInflação em 2015?,\nAbate em 2010?,ABATE_ABPEAV\n", encoding="utf-8")
+
+    assert read_questions(str(path)) == [
+        {"id": "1", "question": "Inflação em 2015?", "sercodigo": ""},
+        {"id": "2", "question": "Abate em 2010?", "sercodigo": "ABATE_ABPEAV"},
+    ]
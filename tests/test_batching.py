@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from rag.batching import MicroBatchEmbedder
+
+
+def test_concurrent_requests_share_one_encode_call():
+    calls = []
+    release = threading.Event()
+
+    def encode(texts):
+        calls.append(list(texts))
+        release.wait(timeout=5)
+        return np.array([[len(t)] for t in texts], dtype=np.float32)
+
+    embedder = MicroBatchEmbedder(encode, max_batch=8, max_wait_ms=200)
+    texts = [f"pergunta {'x' * i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(embedder.embed, t) for t in texts]
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert [r[0] for r in results] == [len(t) for t in texts]
+    assert sum(len(c) for c in calls) == 8
+    assert len(calls) < 8
+
+
+def test_encode_errors_reach_every_caller():
+    def encode(texts):
+        raise RuntimeError("modelo indisponível")
+
+    embedder = MicroBatchEmbedder(encode, max_batch=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="modelo indisponível"):
+        embedder.embed("pergunta")
@@ -0,0 +1,13 @@
+import numpy as np
+import pandas as pd
+
+from rag.context_builder import build_series_context
+
+
+def test_series_without_valid_observations_gets_a_short_context():
+    series = pd.Series([np.nan, np.nan], index=pd.date_range("2010-01-01", periods=2, freq="MS"))
+
+    context = build_series_context(series, "Abate de frangos", "ABATE_ABPEAV", "Como evoluiu o abate?")
+
+    assert "ABATE_ABPEAV" in context
+    assert "Observações: 0" in context
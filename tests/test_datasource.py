@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("ipeadatapy")
+
+from tools.datasource import IpeaDataSource  # noqa: E402
+
+
+@pytest.mark.parametrize("code", ["../../etc/passwd", "A/B", "", "ABC DEF"])
+def test_record_mode_rejects_codes_that_are_not_file_names(tmp_path, code):
+    source = IpeaDataSource(mode="record", fixtures_dir=str(tmp_path / "fixtures"))
+    with pytest.raises(ValueError, match="inválido"):
+        source.timeseries(code)
+    with pytest.raises(ValueError, match="inválido"):
+        source.metadata(code)
+    assert not any(tmp_path.rglob("*.pkl.gz"))
+
+
+def test_replay_reads_fixture_of_a_valid_code(tmp_path):
+    source = IpeaDataSource(mode="replay", fixtures_dir=str(tmp_path))
+    df = pd.DataFrame({"VALUE": [1.0]})
+    source.write_fixture("series/BM12_ERC12", df)
+    pd.testing.assert_frame_equal(source.timeseries("BM12_ERC12"), df)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from tools.downsampling import lttb
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    """
+    LTTB must return the requested number of points, keep the first and last
+    observations and preserve a spike that a uniform sample would miss.
+    """
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[4_321] = 50.0
+
+    idx = lttb(x, y, 200)
+
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 4_321 in idx
+
+
+def test_lttb_returns_all_points_when_series_is_short():
+    x = np.arange(10, dtype=np.float64)
+    assert np.array_equal(lttb(x, x, 50), np.arange(10))
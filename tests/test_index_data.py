@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("ipeadatapy")
+
+from tools import index_data  # noqa: E402
+
+
+class FailingStore:
+    def add_docs(self, docs):
+        raise ConnectionError("Redis fora do ar")
+
+    def add_records(self, records):
+        raise ConnectionError("Redis fora do ar")
+
+
+class NullTimeSeriesStore:
+    def write_series(self, sercodigo, series):
+        return len(series)
+
+
+def test_index_series_skips_a_failing_series(monkeypatch):
+    meta_df = pd.DataFrame([{"CODE": "A", "NAME": "a", "UNIT": "u", "COMMENT": "c"}])
+    df = pd.DataFrame({"VALUE": [1.0, 2.0]}, index=pd.to_datetime(["2000-01-01", "2001-01-01"]))
+    monkeypatch.setattr(index_data.ipea, "timeseries", lambda code: df)
+
+    assert index_data.index_series(FailingStore(), NullTimeSeriesStore(), meta_df, "A") is None
+    # Erro de configuração, e não de uma série: continua interrompendo a execução
+    with pytest.raises(ValueError):
+        index_data.index_series(FailingStore(), NullTimeSeriesStore(), meta_df, "A", layout="x")
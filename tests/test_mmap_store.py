@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from rag.embedding import EMBED_DIM, VectorStore  # noqa: E402
+from rag.mmap_store import NumpyVectorStore, write_mmap_index  # noqa: E402
+
+
+def store_with(docs):
+    # Sem __init__: _rank só usa os documentos, não o modelo nem a matriz
+    store = NumpyVectorStore.__new__(NumpyVectorStore)
+    store.docs = docs
+    return store
+
+
+def test_incomplete_backend_fails_on_construction():
+    class Incomplete(VectorStore):
+        def index_present(self):
+            return True
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_rank_returns_unique_series_by_distance():
+    docs = [{"sercodigo": code, "nome": code.lower()} for code in ("A", "B", "A", "C", "B", "D")]
+    distances = np.array([0.30, 0.20, 0.05, 0.90, 0.10, 0.50])
+
+    # k * 10 >= len(distances): todas as linhas são candidatas (sem argpartition)
+    ranked = store_with(docs)._rank(distances, k=3)
+    assert [r["sercodigo"] for r in ranked] == ["A", "B", "D"]
+    assert ranked[0]["score"] == pytest.approx(0.05)
+
+    # k * 10 == len(distances) e k * 10 < len(distances) (só os 10 mais próximos entram)
+    for size in (10, 25):
+        many = [{"sercodigo": f"S{i}", "nome": ""} for i in range(size)]
+        ranked = store_with(many)._rank(np.arange(size, dtype=np.float64)[::-1], k=1)
+        assert [r["sercodigo"] for r in ranked] == [f"S{size - 1}"]
+
+
+def test_rank_on_empty_index():
+    assert store_with([])._rank(np.empty(0), k=5) == []
+
+
+def test_write_mmap_index_normalizes_and_round_trips(tmp_path):
+    path = str(tmp_path / "idx" / "ipea")
+    vectors = np.zeros((2, EMBED_DIM), dtype=np.float32)
+    vectors[0, 0], vectors[1, 1] = 3.0, 0.5
+    docs = [{"sercodigo": "A", "nome": "a"}, {"sercodigo": "B", "nome": "b"}]
+
+    write_mmap_index(path, vectors, docs)
+
+    saved = np.load(f"{path}.npy", mmap_mode="r")
+    assert np.allclose(np.linalg.norm(saved, axis=1), 1.0)
+    with open(f"{path}.json", encoding="utf-8") as f:
+        assert json.load(f)["docs"] == docs
+    with pytest.raises(ValueError):
+        write_mmap_index(path, vectors, docs[:1])
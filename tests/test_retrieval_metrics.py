@@ -0,0 +1,25 @@
+from rag.retrieval_metrics import recall_at_k, reciprocal_rank, summarize_run
+
+
+def test_recall_and_reciprocal_rank():
+    ranked = ["PRECOS12_IPCA12", "ABATE_ABPEAV", "BM12_TJOVER12"]
+
+    assert recall_at_k(ranked, {"ABATE_ABPEAV"}, 1) == 0.0
+    assert recall_at_k(ranked, {"ABATE_ABPEAV"}, 2) == 1.0
+    assert recall_at_k(ranked, {"ABATE_ABPEAV", "GAC12_SALMINRE12"}, 3) == 0.5
+    assert reciprocal_rank(ranked, {"ABATE_ABPEAV"}) == 0.5
+    assert reciprocal_rank(ranked, {"GAC12_SALMINRE12"}) == 0.0
+
+
+def test_summarize_run_averages_over_questions():
+    summary = summarize_run(
+        rankings=[["A", "B"], ["C", "A"]],
+        expected=[{"A"}, {"B"}],
+        latencies=[0.010, 0.020],
+        ks=(1, 2),
+    )
+
+    assert summary["recall@1"] == 0.5
+    assert summary["recall@2"] == 0.5
+    assert summary["mrr"] == 0.5
+    assert summary["p50_ms"] == 15.0
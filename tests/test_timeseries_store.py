@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("ipeadatapy")
+
+from tools.timeseries_store import SeriesTimeSeriesStore  # noqa: E402
+
+
+class FakeTimeSeries:
+    """Registra os limites enviados ao RedisTimeSeries, que recusa timestamps negativos."""
+
+    def __init__(self):
+        self.bounds = []
+
+    def mrange(self, from_time, to_time, filters, with_labels=False):
+        self.bounds.append((from_time, to_time))
+        return []
+
+    def range(self, key, from_time, to_time):
+        self.bounds.append((from_time, to_time))
+        return []
+
+
+class FakeRedis:
+    def __init__(self):
+        self._ts = FakeTimeSeries()
+
+    def ts(self):
+        return self._ts
+
+
+def test_periods_before_the_epoch_never_become_negative_timestamps():
+    r = FakeRedis()
+    store = SeriesTimeSeriesStore(r)
+
+    # /query: "de 1750 a 1790" (e anos que o pandas nem representa em nanossegundos)
+    assert store.get_frames("ABATE", pd.Timestamp(year=1750, month=1, day=1), pd.Timestamp(year=1790, month=12, day=31)) is None
+    store.get_frames("ABATE", pd.Timestamp(year=1500, month=1, day=1), pd.Timestamp(year=9999, month=12, day=31))
+    # /series/{codigo}/data?start=1700-01-01
+    assert store.get_range("ABATE", pd.Timestamp("1700-01-01"), None).empty
+
+    for start, end in r.ts().bounds:
+        assert start >= 0
+        assert end == "+" or end >= start
@@ -4,10 +4,38 @@ import requests
 import os
 import pandas as pd
 import altair as alt
-import requests
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from tracing import setup_tracing, tracer
+
 API_URL = os.environ.get("API_URL", "http://backend:8997")
+CHART_POINTS = int(os.environ.get("CHART_POINTS", "1000"))
+
+
+def fetch_chart_data(sercodigo: str) -> pd.DataFrame:
+    """
+    Busca os dados do gráfico no endpoint colunar do backend, já reduzidos
+    para no máximo CHART_POINTS pontos.
+    """
+    resp = requests.get(
+        f"{API_URL}/series/{sercodigo}/data",
+        params={"points": CHART_POINTS},
+        timeout=60,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return pd.DataFrame({"date": pd.to_datetime(data["date"]), "value": data["value"]})
+
+
+@st.cache_resource
+def init_tracing() -> bool:
+    # O Streamlit reexecuta o script a cada interação; o tracing é configurado uma vez
+    return setup_tracing()
+
+
+init_tracing()
 
 
 # --- FUNÇÃO COM CACHE DE 5 MINUTOS ---
@@ -48,6 +76,8 @@ if "final_answer" not in st.session_state:
     st.session_state.final_answer = None
 if "selected_series_code" not in st.session_state:
     st.session_state.selected_series_code = None
+if "chart_data" not in st.session_state:
+    st.session_state.chart_data = None
 
 # --- LÓGICA DE EXIBIÇÃO NA SIDEBAR ---
 # Coloque este bloco de código na parte principal do seu script Streamlit
@@ -97,7 +127,7 @@ with st.container(border=True):
             st.error("Por favor, insira uma pergunta.")
         else:
             # ETAPA 1: Chamar um novo endpoint para encontrar a série
-            with st.spinner("Buscando séries correspondentes..."):
+            with st.spinner("Buscando séries correspondentes..."), tracer.start_as_current_span("ui.find_series"):
                 try:
                     payload = {"question": question, "top_k": top_k}
                     # IMPORTANTE: Usaremos um novo endpoint `/find_series`
@@ -120,13 +150,16 @@ if st.session_state.series_candidates is not None:
 
         #if st.button("3. Gerar Análise", type="primary"):
         # ETAPA 2: Chamar o endpoint de query com a série confirmada
-        with st.spinner(f"Analisando a série {st.session_state.selected_series_code}...Isso pode levar um minuto."):
+        with st.spinner(f"Analisando a série {st.session_state.selected_series_code}...Isso pode levar um minuto."), \
+                tracer.start_as_current_span("ui.query"):
             try:
                 payload = {
                     "question": question,
                     "sercodigo": st.session_state.selected_series_code,
                     "use_model": "openai",
-                    "model_name": "gpt-4o-mini"
+                    "model_name": "gpt-4o-mini",
+                    # As demais candidatas entram na comparação entre séries
+                    "related_codes": ",".join(c['sercodigo'] for c in st.session_state.series_candidates),
                 }
 
                 files_to_send = {}
@@ -134,12 +167,22 @@ if st.session_state.series_candidates is not None:
                 # Prepara o arquivo para ser enviado na requisição multipart
                     files_to_send['attachment'] = (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)
 
-                resp = requests.post(
-                    f"{API_URL}/query", 
-                    data=payload, 
-                    files=files_to_send, 
-                    timeout=180
-                )                    
+                # O gráfico é buscado em paralelo com a resposta do LLM
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    # A thread recebe uma cópia do contexto para o gráfico entrar no mesmo trace
+                    chart_future = executor.submit(
+                        contextvars.copy_context().run, fetch_chart_data, st.session_state.selected_series_code
+                    )
+                    resp = requests.post(
+                        f"{API_URL}/query", 
+                        data=payload, 
+                        files=files_to_send, 
+                        timeout=180
+                    )
+                    try:
+                        st.session_state.chart_data = chart_future.result()
+                    except requests.exceptions.RequestException:
+                        st.session_state.chart_data = None
 
 
                 if resp.status_code == 200:
@@ -170,13 +213,12 @@ if st.session_state.final_answer:
 
     
 
-    if answer.get("chart_data"):
+    df_chart = st.session_state.chart_data
+    if df_chart is not None:
         st.subheader("Visualização dos Dados")
-        df_chart = pd.DataFrame(answer["chart_data"])
         
-        # Adiciona uma verificação extra para o caso de o dataframe estar vazio após a conversão
+        # Adiciona uma verificação extra para o caso de o dataframe estar vazio
         if not df_chart.empty:
-            df_chart['date'] = pd.to_datetime(df_chart['date'])
             chart = alt.Chart(df_chart).mark_line().encode(
                 x=alt.X('date:T', title='Data'),
                 y=alt.Y('value:Q', title='Valor'),
@@ -184,10 +226,10 @@ if st.session_state.final_answer:
             ).interactive()
             st.altair_chart(chart, use_container_width=True)
         else:
-            # Esta mensagem aparecerá se a lista de chart_data estiver vazia
+            # Esta mensagem aparecerá se a série não tiver pontos no período
             st.warning("Não há dados disponíveis para plotar o gráfico no período selecionado.")
     else:
-        # Esta mensagem aparecerá se a chave 'chart_data' estiver totalmente ausente
+        # Esta mensagem aparecerá se o endpoint de dados do gráfico falhar
         st.info("Nenhum dado para o gráfico foi retornado pela API.")
 
     
@@ -0,0 +1,67 @@
+# ui/tracing.py
+"""
+Tracing da UI com OpenTelemetry (desligado por padrão, OTEL_TRACES_EXPORTER=none).
+
+A instrumentação do `requests` injeta o cabeçalho `traceparent` nas chamadas ao
+backend, que continua o mesmo trace. Exportadores: file (um span JSON por linha
+em OTEL_TRACES_FILE), otlp (OTEL_EXPORTER_OTLP_ENDPOINT) ou console. Sem os
+pacotes do OpenTelemetry, os spans são no-ops.
+"""
+import os
+from contextlib import nullcontext
+from pathlib import Path
+
+OTEL_TRACES_EXPORTER = os.environ.get("OTEL_TRACES_EXPORTER", "none")
+OTEL_TRACES_FILE = os.environ.get("OTEL_TRACES_FILE", "traces/ui.jsonl")
+OTEL_SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "inspector-ui")
+
+
+class _NoopTracer:
+    def start_as_current_span(self, name: str, *args, **kwargs):
+        return nullcontext()
+
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+    tracer = _NoopTracer()
+else:
+    tracer = trace.get_tracer("inspector-ui")
+
+
+def _span_exporter(kind: str):
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if kind == "file":
+        Path(OTEL_TRACES_FILE).parent.mkdir(parents=True, exist_ok=True)
+        return ConsoleSpanExporter(
+            out=open(OTEL_TRACES_FILE, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if kind == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"OTEL_TRACES_EXPORTER inválido: '{kind}'. Use none, file, otlp ou console.")
+
+
+def setup_tracing() -> bool:
+    if OTEL_TRACES_EXPORTER == "none":
+        return False
+    try:
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        print(f"⚠️ Tracing desativado: pacotes do OpenTelemetry ausentes ({e}).")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(_span_exporter(OTEL_TRACES_EXPORTER)))
+    trace.set_tracer_provider(provider)
+    RequestsInstrumentor().instrument()
+    print(f"🔭 Tracing ativo ({OTEL_TRACES_EXPORTER}) para o serviço {OTEL_SERVICE_NAME}.")
+    return True